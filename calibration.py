@@ -2,6 +2,8 @@ import os
 import cv2
 import numpy as np
 
+from core.image_io import fast_imread
+
 JPEG_DIR = "jpeg"
 
 # Input image from your capture (distorted)
@@ -13,7 +15,7 @@ OUT_WIDTH = 800     # horizontal pixels
 OUT_HEIGHT = 1600   # vertical pixels
 
 points = []
-img = cv2.imread(IMAGE_PATH)
+img = fast_imread(IMAGE_PATH)
 if img is None:
     raise RuntimeError("Could not read image")
 
@@ -2,21 +2,35 @@ import argparse
 import cv2
 import numpy as np
 import os
+import queue
 import sys
+import threading
 import time
+from collections import deque
 from datetime import datetime
 from typing import Optional, Tuple
 
-from core.utils import open_camera
+from core.image_io import encode_jpeg, update_latest_alias
+from core.rectification import cached_rectify_maps, cuda_available, translation
+from core.utils import configure_capture, open_camera
 
 # ==== CONFIG ====
 DEFAULT_CAMERA_INDEX = 0  # Change to 1, 2, ... if your HDMI-USB device isn't at 0
+DEFAULT_CAPTURE_FOURCC = "MJPG"  # Compressed frames from the grabber; "" keeps the driver default
+DEFAULT_CAPTURE_WIDTH = 1920
+DEFAULT_CAPTURE_HEIGHT = 1080
+DEFAULT_CAPTURE_FPS = 30
 OUTPUT_DIR = "captured_frames"
 LATEST_FRAME_ALIAS = "latest_frame.jpg"
+JPEG_QUALITY = 85         # Quality for saved frames
 POLL_INTERVAL_SEC = 1.0   # How often to poll (seconds)
+MAX_STALE_GRABS = 8       # Upper bound on buffered frames skipped per poll
 CHANGE_THRESHOLD = 5.0    # Mean pixel difference threshold (tune as needed)
 COMPARE_WIDTH = 320       # Downscaled width for comparison
 COMPARE_HEIGHT = 180      # Downscaled height for comparison
+HIST_BLOCK_SIZE = 16      # Block edge (pixels) for the histogram detector
+HIST_BINS = 16            # Luma bins per block for the histogram detector
+HIST_MIN_SCORE = 0.1      # Floor for the adaptive histogram threshold
 WINDOW_NAME = "Latest captured frame"
 DEFAULT_CAMERA_MATRIX = "camera_matrix.npy"
 DEFAULT_DIST_COEFFS = "dist_coeffs.npy"
@@ -25,18 +39,148 @@ DEFAULT_HOMOGRAPHY = "homography.npy"
 DEFAULT_RECTIFIED_WIDTH = 800
 DEFAULT_RECTIFIED_HEIGHT = 1600
 DEFAULT_CROP_RECT = "crop_rect.npy"
+REMAP_CACHE_DIR = "remap_cache"  # Fused undistort/warp tables, keyed by calibration hash
 # =================
 
+SAVE_QUEUE_SIZE = 16
+_save_queue: "queue.Queue" = queue.Queue(maxsize=SAVE_QUEUE_SIZE)
+_writer_thread: Optional[threading.Thread] = None
+
+def _write_jpeg(frame, filename, latest_path):
+    # Encode once; the alias is a hard link to the new frame where supported.
+    data = encode_jpeg(frame, quality=JPEG_QUALITY)
+    if data is None:
+        print(f"Warning: failed to encode {filename}")
+        return
+    with open(filename, "wb") as handle:
+        handle.write(data)
+    update_latest_alias(filename, latest_path, data)
+    print(f"Saved: {filename} (latest -> {latest_path})")
+
+def _writer_loop():
+    while True:
+        item = _save_queue.get()
+        try:
+            _write_jpeg(*item)
+        except Exception as exc:  # keep the writer alive so flush_saved_frames() returns
+            print(f"Warning: failed to write frame: {exc}")
+        finally:
+            _save_queue.task_done()
+
+def flush_saved_frames():
+    """Block until every queued frame has been written to disk."""
+    if _writer_thread is not None:
+        _save_queue.join()
+
 def save_frame(frame):
+    """Queue the frame for JPEG encoding on the writer thread and return its path."""
+    global _writer_thread
+    if _writer_thread is None:
+        _writer_thread = threading.Thread(target=_writer_loop, name="frame-writer", daemon=True)
+        _writer_thread.start()
+
     ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
     filename = os.path.join(OUTPUT_DIR, f"frame_{ts}.jpg")
-    cv2.imwrite(filename, frame)
     # Keep an easy-to-find alias for the latest capture so it can be shown elsewhere.
     latest_path = os.path.join(OUTPUT_DIR, LATEST_FRAME_ALIAS)
-    cv2.imwrite(latest_path, frame)
-    print(f"Saved: {filename} (latest -> {latest_path})")
+    try:
+        _save_queue.put_nowait((frame.copy(), filename, latest_path))
+    except queue.Full:
+        print(f"Warning: writer is behind; dropped {filename}")
     return filename
 
+def sad_reaches(a, b, thresh_sum):
+    """Return True when the sum of absolute differences reaches thresh_sum.
+
+    cv2.norm(NORM_L1) computes the SAD with OpenCV's SIMD kernels without
+    materialising a difference image; on the 320x180 comparison frames it
+    beats both absdiff().sum() and a JIT scalar loop with early exit.
+    """
+    return cv2.norm(a, b, cv2.NORM_L1) >= thresh_sum
+
+class BlockHistogramDetector:
+    """Scene-change detector comparing per-block luma histograms.
+
+    The comparison frame is tiled into square blocks, each reduced to a small
+    histogram, and the mean chi-square distance to the reference frame is tested
+    against a threshold that tracks the median of recent scores. Global lighting
+    drift moves every block a little and raises the threshold with it, while a
+    real change moves a few blocks a lot.
+    """
+
+    def __init__(
+        self,
+        block_size: int = HIST_BLOCK_SIZE,
+        bins: int = HIST_BINS,
+        k: float = 3.0,
+        history: int = 30,
+        min_score: float = HIST_MIN_SCORE,
+    ) -> None:
+        self.block_size = block_size
+        self.bins = bins
+        self.k = k
+        self.min_score = min_score
+        self._scores = deque(maxlen=history)
+        self._threshold = min_score
+        self._reference = None
+        self._reference_hist = None
+
+    def _histograms(self, gray):
+        bs = self.block_size
+        rows, cols = gray.shape[0] // bs, gray.shape[1] // bs
+        tiles = gray[: rows * bs, : cols * bs].reshape(rows, bs, cols, bs)
+        bin_idx = tiles.astype(np.int32) * self.bins // 256
+        block_idx = np.arange(rows)[:, None, None, None] * cols + np.arange(cols)[None, None, :, None]
+        labels = block_idx * self.bins + bin_idx
+        counts = np.bincount(labels.ravel(), minlength=rows * cols * self.bins)
+        return counts.reshape(rows * cols, self.bins) / float(bs * bs)
+
+    def changed(self, gray, reference) -> bool:
+        if reference is not self._reference:
+            self._reference = reference
+            self._reference_hist = self._histograms(reference)
+        hist = self._histograms(gray)
+        total = hist + self._reference_hist
+        chi = (hist - self._reference_hist) ** 2 / np.maximum(total, 1e-9)
+        score = float(chi.sum(axis=1).mean())
+
+        if self._scores:
+            median = float(np.median(self._scores))
+            self._threshold = 0.5 * self._threshold + 0.5 * self.k * median
+        self._scores.append(score)
+        return score >= max(self._threshold, self.min_score)
+
+def read_latest_frame(cap, frame_interval: float):
+    """Drain frames queued by the driver and decode only the newest one.
+
+    Queued frames come back from ``grab()`` immediately, while a grab that
+    blocks for a good part of ``frame_interval`` waited for the sensor, so its
+    frame is fresh. Drivers that ignore ``CAP_PROP_BUFFERSIZE`` still get
+    drained; ``MAX_STALE_GRABS`` bounds the loop if timing is unreliable.
+    """
+    for _ in range(MAX_STALE_GRABS):
+        started = time.monotonic()
+        if not cap.grab():
+            return False, None
+        if time.monotonic() - started >= 0.5 * frame_interval:
+            break
+    return cap.retrieve()
+
+def wait_for_next_poll(deadline: float) -> float:
+    """Sleep until the next poll slot and return the new deadline.
+
+    Slots are laid out on the monotonic clock, so time spent processing a
+    frame is taken out of the sleep rather than added to the period. When a
+    frame overruns its slot the schedule restarts from now instead of firing a
+    burst of catch-up polls.
+    """
+    deadline += POLL_INTERVAL_SEC
+    slack = deadline - time.monotonic()
+    if slack > 0:
+        time.sleep(slack)
+        return deadline
+    return time.monotonic()
+
 class FrameDisplay:
     """Encapsulates the OpenCV window so we can toggle fullscreen/move windows."""
 
@@ -83,9 +227,20 @@ class FrameCropper:
             )
         rect = rect.reshape(-1)
         self.x, self.y, self.w, self.h = [int(v) for v in rect]
+        self._slice = (slice(self.y, self.y + self.h), slice(self.x, self.x + self.w))
+        self._validated = False
 
     def __call__(self, frame):
-        return frame[self.y:self.y + self.h, self.x:self.x + self.w]
+        # Frame geometry is fixed for a capture session, so bounds are checked once.
+        if not self._validated:
+            frame_h, frame_w = frame.shape[:2]
+            if self.x < 0 or self.y < 0 or self.x + self.w > frame_w or self.y + self.h > frame_h:
+                raise ValueError(
+                    f"Crop rectangle extends outside frame bounds ({frame_w}x{frame_h}): "
+                    f"[{self.x}, {self.y}, {self.w}, {self.h}]"
+                )
+            self._validated = True
+        return frame[self._slice]
 
 
 class FrameRectifier:
@@ -100,6 +255,7 @@ class FrameRectifier:
         out_width: int,
         out_height: int,
         cropper: Optional[FrameCropper] = None,
+        use_gpu: bool = True,
     ) -> None:
         self.K = np.load(camera_matrix_path)
         self.dist = np.load(dist_coeffs_path)
@@ -107,12 +263,46 @@ class FrameRectifier:
         self.H = np.load(homography_path)
         self.out_size = (int(out_width), int(out_height))
         self.cropper = cropper
+        # Undistort, crop and warp are folded into one lookup table so each frame
+        # is resampled exactly once.
+        inverse_warp = np.linalg.inv(self.H)
+        valid_rect = None
+        if cropper:
+            inverse_warp = translation(cropper.x, cropper.y) @ inverse_warp
+            valid_rect = (cropper.x, cropper.y, cropper.w, cropper.h)
+        # cv2.cuda.remap only accepts float maps; the CPU path uses fixed-point.
+        self.use_gpu = use_gpu and cuda_available()
+        self._map1, self._map2 = cached_rectify_maps(
+            REMAP_CACHE_DIR,
+            self.K,
+            self.dist,
+            self.newK,
+            inverse_warp,
+            self.out_size,
+            valid_rect=valid_rect,
+            map_type=cv2.CV_32FC1 if self.use_gpu else cv2.CV_16SC2,
+        )
+        if self.use_gpu:
+            self._gpu_map1 = cv2.cuda_GpuMat()
+            self._gpu_map1.upload(self._map1)
+            self._gpu_map2 = cv2.cuda_GpuMat()
+            self._gpu_map2.upload(self._map2)
+            self._gpu_frame = cv2.cuda_GpuMat()
 
     def __call__(self, frame):
-        undist = cv2.undistort(frame, self.K, self.dist, None, self.newK)
-        if self.cropper:
-            undist = self.cropper(undist)
-        return cv2.warpPerspective(undist, self.H, self.out_size)
+        if self.use_gpu:
+            self._gpu_frame.upload(frame)
+            warped = cv2.cuda.remap(
+                self._gpu_frame,
+                self._gpu_map1,
+                self._gpu_map2,
+                cv2.INTER_LINEAR,
+                borderMode=cv2.BORDER_CONSTANT,
+            )
+            return warped.download()
+        return cv2.remap(
+            frame, self._map1, self._map2, cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT
+        )
 
 def list_available_cameras(max_index: int) -> None:
     print("Probing camera indexes 0..{}".format(max_index))
@@ -139,6 +329,29 @@ def parse_args():
         default=DEFAULT_CAMERA_INDEX,
         help="Camera index to open (default: %(default)s)",
     )
+    parser.add_argument(
+        "--fourcc",
+        default=DEFAULT_CAPTURE_FOURCC,
+        help="Pixel format to request from the camera; pass '' for the driver default (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--capture-width",
+        type=int,
+        default=DEFAULT_CAPTURE_WIDTH,
+        help="Capture width to request; 0 keeps the driver default (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--capture-height",
+        type=int,
+        default=DEFAULT_CAPTURE_HEIGHT,
+        help="Capture height to request; 0 keeps the driver default (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--capture-fps",
+        type=int,
+        default=DEFAULT_CAPTURE_FPS,
+        help="Frame rate to request; 0 keeps the driver default (default: %(default)s)",
+    )
     parser.add_argument(
         "--list-cameras",
         action="store_true",
@@ -150,6 +363,12 @@ def parse_args():
         default=3,
         help="Highest index to probe when using --list-cameras",
     )
+    parser.add_argument(
+        "--detector",
+        choices=("sad", "histogram"),
+        default="sad",
+        help="Scene-change metric: mean pixel difference (sad) or adaptive block histograms",
+    )
     parser.add_argument(
         "--no-display",
         action="store_true",
@@ -185,6 +404,11 @@ def parse_args():
         action="store_true",
         help="Undistort + warp frames using calibration data (radial_snippet integration)",
     )
+    parser.add_argument(
+        "--no-gpu",
+        action="store_true",
+        help="Keep rectification on the CPU even when OpenCV reports a CUDA device",
+    )
     parser.add_argument(
         "--camera-matrix-path",
         default=DEFAULT_CAMERA_MATRIX,
@@ -242,8 +466,23 @@ def main():
 
     if not cap.isOpened():
         raise RuntimeError(f"Cannot open camera at index {args.camera_index}")
+    fourcc, width, height, fps = configure_capture(
+        cap,
+        fourcc=args.fourcc,
+        width=args.capture_width,
+        height=args.capture_height,
+        fps=args.capture_fps,
+    )
+    print(f"Capture format: {fourcc or 'default'} {width}x{height} @ {fps:g} fps")
+    # Keep the driver queue short so each poll sees a fresh frame.
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    frame_interval = 1.0 / fps if fps and fps > 0 else 1.0 / DEFAULT_CAPTURE_FPS
 
     prev_gray_small = None
+    frame_small = None
+    # Mean-difference threshold expressed as a total absolute difference.
+    change_sum = CHANGE_THRESHOLD * COMPARE_WIDTH * COMPARE_HEIGHT
+    histogram_detector = BlockHistogramDetector() if args.detector == "histogram" else None
     display_enabled = not args.no_display
     display_position = None
     if args.display_x is not None and args.display_y is not None:
@@ -290,21 +529,25 @@ def main():
             out_width=args.rectified_width,
             out_height=args.rectified_height,
             cropper=cropper,
+            use_gpu=not args.no_gpu,
         )
         post_rect_cropper = None
 
     try:
+        deadline = time.monotonic()
         while True:
-            ret, raw_frame = cap.read()
+            ret, raw_frame = read_latest_frame(cap, frame_interval)
             if not ret:
                 print("Warning: failed to read frame from capture device")
-                time.sleep(POLL_INTERVAL_SEC)
+                deadline = wait_for_next_poll(deadline)
                 continue
 
             frame = rectifier(raw_frame) if rectifier else raw_frame
             frame = post_rect_cropper(frame) if post_rect_cropper else frame
 
-            frame_small = cv2.resize(frame, (COMPARE_WIDTH, COMPARE_HEIGHT))
+            # Shrink first so the colour conversion only touches the
+            # thumbnail; the BGR thumbnail buffer is reused across polls.
+            frame_small = cv2.resize(frame, (COMPARE_WIDTH, COMPARE_HEIGHT), dst=frame_small)
             gray_small = cv2.cvtColor(frame_small, cv2.COLOR_BGR2GRAY)
 
             if prev_gray_small is None:
@@ -312,21 +555,24 @@ def main():
                 frame_display.show(frame)
                 prev_gray_small = gray_small
             else:
-                diff = cv2.absdiff(gray_small, prev_gray_small)
-                mean_diff = diff.mean()
+                if histogram_detector:
+                    changed = histogram_detector.changed(gray_small, prev_gray_small)
+                else:
+                    changed = sad_reaches(gray_small, prev_gray_small, change_sum)
 
-                if mean_diff >= CHANGE_THRESHOLD:
+                if changed:
                     save_frame(frame)
                     frame_display.show(frame)
                     prev_gray_small = gray_small
 
-            time.sleep(POLL_INTERVAL_SEC)
+            deadline = wait_for_next_poll(deadline)
 
     except KeyboardInterrupt:
         print("Stopping capture.")
 
     finally:
         cap.release()
+        flush_saved_frames()
         frame_display.close()
 
 
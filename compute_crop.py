@@ -3,6 +3,8 @@ import cv2
 import json
 import numpy as np
 
+from core.image_io import fast_imread
+
 JPEG_DIR      = "jpeg"
 IMG_PATH      = os.path.join(JPEG_DIR, "undist_best.jpg")
 LINES_JSON    = "sheet_lines.json"
@@ -13,7 +15,7 @@ CROP_OUT_IMG  = os.path.join(JPEG_DIR, "undist_cropped.jpg")
 CROP_RECT_NPY = "crop_rect.npy"      # [x, y, w, h]
 
 # Load data
-img   = cv2.imread(IMG_PATH)
+img   = fast_imread(IMG_PATH)
 if img is None:
     raise RuntimeError("Could not read undistorted image")
 
@@ -28,15 +30,11 @@ K    = np.load(K_PATH)
 dist = np.load(DIST_PATH)
 newK = np.load(NEWK_PATH)
 
-# Undistort the clicked points into the same coordinate system as undist_best.jpg
-all_pts = []
-for pts in lines:
-    pts = pts.reshape(-1, 1, 2)
-    und = cv2.undistortPoints(pts, K, dist, P=newK)  # P=newK -> pixel coords in undistorted image
-    und = und.reshape(-1, 2)
-    all_pts.append(und)
-
-all_pts = np.vstack(all_pts).astype(np.float32)
+# Undistort the clicked points into the same coordinate system as undist_best.jpg.
+# Only the combined point cloud is needed, so undistort every line in one call.
+clicked = np.vstack(lines).reshape(-1, 1, 2)
+all_pts = cv2.undistortPoints(clicked, K, dist, P=newK)  # P=newK -> pixel coords in undistorted image
+all_pts = all_pts.reshape(-1, 2).astype(np.float32)
 
 # Use convex hull of all undistorted points, then its bounding rectangle
 hull = cv2.convexHull(all_pts)
@@ -16,11 +16,13 @@ class SheetAdmin(admin.ModelAdmin):
 class CameraAdmin(admin.ModelAdmin):
     list_display = ('sheet', 'side', 'device_index', 'snapshot_url', 'is_calibrated', 'motion_capture_pid')
     list_filter = ('sheet', 'side', 'is_calibrated')
+    list_select_related = ('sheet',)
 
 @admin.register(CapturedFrame)
 class CapturedFrameAdmin(admin.ModelAdmin):
     list_display = ('camera', 'timestamp', 'has_rectified_image')
     list_filter = ('camera__sheet', 'camera__side')
+    list_select_related = ('camera', 'camera__sheet')
 
     @admin.display(boolean=True, description='Rectified Saved')
     def has_rectified_image(self, obj):
@@ -31,6 +33,7 @@ class CapturedFrameAdmin(admin.ModelAdmin):
 class CalibrationArtifactAdmin(admin.ModelAdmin):
     list_display = ('camera', 'artifact_type', 'created_at')
     list_filter = ('artifact_type', 'camera__sheet', 'camera__side')
+    list_select_related = ('camera', 'camera__sheet')
 
 
 class CalibrationLinePointInline(admin.TabularInline):
@@ -44,5 +47,6 @@ class CalibrationLinePointInline(admin.TabularInline):
 class CalibrationSessionAdmin(admin.ModelAdmin):
     list_display = ('camera', 'status', 'fit_error', 'created_at')
     list_filter = ('status', 'camera__sheet', 'camera__side')
+    list_select_related = ('camera', 'camera__sheet')
     readonly_fields = ('created_at', 'updated_at', 'artifact_dir')
     inlines = [CalibrationLinePointInline]
@@ -1,14 +1,17 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Sequence, Tuple
+from typing import Dict, List, Tuple
 
 import cv2
 import numpy as np
 
 from .calibration_pipeline import CalibrationComputationError
+from .image_io import fast_imread_gray
+from .jit import njit
 
-PointList = List[Tuple[int, int]]
+# (N, 2) int32 pixel coordinates; converted to plain lists only for JSON output.
+PointList = np.ndarray
 
 # World Curling Federation sheet dimensions (feet)
 SHEET_WIDTH_FT = 14.5
@@ -22,6 +25,16 @@ HOUSE_RADII_FT = [
     ("4ft", 2.0),
     ("button", 0.5),
 ]
+_HOUSE_CENTERS = (("far", TEELINE_OFFSET_FT), ("near", SHEET_LENGTH_FT - TEELINE_OFFSET_FT))
+REFERENCE_LINE_NAMES = (
+    "center_line",
+    "hog_far",
+    "hog_near",
+    "tee_far",
+    "tee_near",
+    "back_far",
+    "back_near",
+)
 
 @dataclass
 class AutoCalibrationResult:
@@ -29,22 +42,27 @@ class AutoCalibrationResult:
     features: Dict[str, object]
 
 
-def generate_auto_calibration(image_path: str) -> AutoCalibrationResult:
-    image = cv2.imread(image_path)
-    if image is None:
+def generate_auto_calibration(image_path: str, image: np.ndarray | None = None) -> AutoCalibrationResult:
+    if image is not None:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    else:
+        gray = fast_imread_gray(image_path)
+    if gray is None:
         raise CalibrationComputationError(f"Unable to read calibration image at {image_path}")
 
-    corners = _detect_sheet_corners(image)
+    corners = _detect_sheet_corners(gray)
     homography = _build_homography(corners)
 
-    reference_lines = _build_reference_lines(homography)
-    features = _summarize_features(corners, homography, reference_lines)
+    projected = _project_to_points(homography, _CANONICAL_POINTS)
+    points = {name: projected[span] for name, span in _CANONICAL_LAYOUT.items()}
 
-    return AutoCalibrationResult(lines=list(reference_lines.values()), features=features)
+    lines = [points[name] for name in REFERENCE_LINE_NAMES]
+    features = _summarize_features(corners, points)
 
+    return AutoCalibrationResult(lines=lines, features=features)
 
-def _detect_sheet_corners(image: np.ndarray) -> np.ndarray:
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+def _detect_sheet_corners(gray: np.ndarray) -> np.ndarray:
     blurred = cv2.GaussianBlur(gray, (5, 5), 0)
     edges = cv2.Canny(blurred, 25, 75)
 
@@ -64,15 +82,29 @@ def _detect_sheet_corners(image: np.ndarray) -> np.ndarray:
     return _order_points(box.astype(np.float32))
 
 
+@njit(cache=True)
 def _order_points(points: np.ndarray) -> np.ndarray:
+    # Scalar scan over the four corners; cheaper than four numpy reductions
+    # for N=4 and compiles cleanly when Numba is available.
     ordered = np.zeros((4, 2), dtype=np.float32)
-    s = points.sum(axis=1)
-    diff = np.diff(points, axis=1)
-
-    ordered[0] = points[np.argmin(s)]  # top-left
-    ordered[2] = points[np.argmax(s)]  # bottom-right
-    ordered[1] = points[np.argmin(diff)]  # top-right
-    ordered[3] = points[np.argmax(diff)]  # bottom-left
+    min_sum = max_sum = 0
+    min_diff = max_diff = 0
+    for i in range(1, 4):
+        s = points[i, 0] + points[i, 1]
+        d = points[i, 1] - points[i, 0]
+        if s < points[min_sum, 0] + points[min_sum, 1]:
+            min_sum = i
+        if s > points[max_sum, 0] + points[max_sum, 1]:
+            max_sum = i
+        if d < points[min_diff, 1] - points[min_diff, 0]:
+            min_diff = i
+        if d > points[max_diff, 1] - points[max_diff, 0]:
+            max_diff = i
+
+    ordered[0] = points[min_sum]  # top-left
+    ordered[2] = points[max_sum]  # bottom-right
+    ordered[1] = points[min_diff]  # top-right
+    ordered[3] = points[max_diff]  # bottom-left
     return ordered
 
 
@@ -89,42 +121,60 @@ def _build_homography(corners: np.ndarray) -> np.ndarray:
     return cv2.getPerspectiveTransform(canonical, corners)
 
 
-def _build_reference_lines(homography: np.ndarray) -> Dict[str, PointList]:
-    lines: Dict[str, PointList] = {}
-    center_x = SHEET_WIDTH_FT / 2.0
-    lines["center_line"] = _vertical_line(homography, center_x)
-
-    lines["hog_far"] = _horizontal_line(homography, HOGLINE_OFFSET_FT)
-    lines["hog_near"] = _horizontal_line(homography, SHEET_LENGTH_FT - HOGLINE_OFFSET_FT)
-
-    lines["tee_far"] = _horizontal_line(homography, TEELINE_OFFSET_FT)
-    lines["tee_near"] = _horizontal_line(homography, SHEET_LENGTH_FT - TEELINE_OFFSET_FT)
+def _canonical_layout() -> Tuple[np.ndarray, Dict[str, slice]]:
+    """Stack every canonical sample point so they can be projected in one call.
+
+    Returns the (N, 2) array of sheet coordinates in feet and a mapping from
+    feature name to the rows holding its points.
+    """
+    blocks: List[np.ndarray] = []
+    layout: Dict[str, slice] = {}
+    start = 0
+
+    def add(name: str, block: np.ndarray) -> None:
+        nonlocal start
+        blocks.append(block)
+        layout[name] = slice(start, start + len(block))
+        start += len(block)
+
+    add("center_line", _vertical_line(SHEET_WIDTH_FT / 2.0))
+    add("hog_far", _horizontal_line(HOGLINE_OFFSET_FT))
+    add("hog_near", _horizontal_line(SHEET_LENGTH_FT - HOGLINE_OFFSET_FT))
+    add("tee_far", _horizontal_line(TEELINE_OFFSET_FT))
+    add("tee_near", _horizontal_line(SHEET_LENGTH_FT - TEELINE_OFFSET_FT))
+    add("back_far", _horizontal_line(BACKLINE_OFFSET_FT))
+    add("back_near", _horizontal_line(SHEET_LENGTH_FT - BACKLINE_OFFSET_FT))
+
+    for end_label, center_y in _HOUSE_CENTERS:
+        add(f"house_{end_label}_center", np.array([[SHEET_WIDTH_FT / 2.0, center_y]]))
+        for name, radius_ft in HOUSE_RADII_FT:
+            add(f"house_{end_label}_{name}", np.array([[SHEET_WIDTH_FT / 2.0 + radius_ft, center_y]]))
 
-    lines["back_far"] = _horizontal_line(homography, BACKLINE_OFFSET_FT)
-    lines["back_near"] = _horizontal_line(homography, SHEET_LENGTH_FT - BACKLINE_OFFSET_FT)
-    return lines
+    return np.vstack(blocks).astype(np.float32), layout
 
 
-def _vertical_line(homography: np.ndarray, x_ft: float, samples: int = 200) -> PointList:
+def _vertical_line(x_ft: float, samples: int = 200) -> np.ndarray:
     ys = np.linspace(0.0, SHEET_LENGTH_FT, samples)
-    canonical = np.column_stack([np.full_like(ys, x_ft), ys])
-    return _project_to_points(homography, canonical)
+    return np.column_stack([np.full_like(ys, x_ft), ys])
 
 
-def _horizontal_line(homography: np.ndarray, y_ft: float, samples: int = 160) -> PointList:
+def _horizontal_line(y_ft: float, samples: int = 160) -> np.ndarray:
     xs = np.linspace(0.0, SHEET_WIDTH_FT, samples)
-    canonical = np.column_stack([xs, np.full_like(xs, y_ft)])
-    return _project_to_points(homography, canonical)
+    return np.column_stack([xs, np.full_like(xs, y_ft)])
+
+
+# The sheet geometry is fixed, so the canonical samples are built once at import.
+_CANONICAL_POINTS, _CANONICAL_LAYOUT = _canonical_layout()
+_CANONICAL_POINTS.setflags(write=False)
 
 
 def _project_to_points(homography: np.ndarray, canonical_points: np.ndarray) -> PointList:
-    pts = canonical_points.astype(np.float32).reshape(-1, 1, 2)
+    pts = np.asarray(canonical_points, dtype=np.float32).reshape(-1, 1, 2)
     projected = cv2.perspectiveTransform(pts, homography).reshape(-1, 2)
-    rounded = np.rint(projected).astype(int)
-    return [(int(pt[0]), int(pt[1])) for pt in rounded]
+    return np.rint(projected).astype(np.int32)
 
 
-def _line_endpoints(points: Sequence[Tuple[int, int]]) -> Dict[str, List[int]]:
+def _line_endpoints(points: PointList) -> Dict[str, List[int]]:
     return {
         "start": [int(points[0][0]), int(points[0][1])],
         "end": [int(points[-1][0]), int(points[-1][1])],
@@ -133,38 +183,31 @@ def _line_endpoints(points: Sequence[Tuple[int, int]]) -> Dict[str, List[int]]:
 
 def _summarize_features(
     corners: np.ndarray,
-    homography: np.ndarray,
-    lines: Dict[str, PointList],
+    points: Dict[str, PointList],
 ) -> Dict[str, object]:
     features: Dict[str, object] = {
         "sheet_corners": corners.round().astype(int).tolist(),
-        "center_line": _line_endpoints(lines["center_line"]),
+        "center_line": _line_endpoints(points["center_line"]),
         "hog_lines": {
-            "far": _line_endpoints(lines["hog_far"]),
-            "near": _line_endpoints(lines["hog_near"]),
+            "far": _line_endpoints(points["hog_far"]),
+            "near": _line_endpoints(points["hog_near"]),
         },
         "tee_lines": {
-            "far": _line_endpoints(lines["tee_far"]),
-            "near": _line_endpoints(lines["tee_near"]),
+            "far": _line_endpoints(points["tee_far"]),
+            "near": _line_endpoints(points["tee_near"]),
         },
         "back_lines": {
-            "far": _line_endpoints(lines["back_far"]),
-            "near": _line_endpoints(lines["back_near"]),
+            "far": _line_endpoints(points["back_far"]),
+            "near": _line_endpoints(points["back_near"]),
         },
     }
 
     house_features = []
-    for end_label, center_y in ("far", TEELINE_OFFSET_FT), ("near", SHEET_LENGTH_FT - TEELINE_OFFSET_FT):
-        center_pt = _project_to_points(
-            homography,
-            np.array([[SHEET_WIDTH_FT / 2.0, center_y]], dtype=np.float32),
-        )[0]
-        for name, radius_ft in HOUSE_RADII_FT:
-            edge_point = _project_to_points(
-                homography,
-                np.array([[SHEET_WIDTH_FT / 2.0 + radius_ft, center_y]], dtype=np.float32),
-            )[0]
-            radius_px = int(round(float(np.linalg.norm(np.array(center_pt) - np.array(edge_point)))))
+    for end_label, _ in _HOUSE_CENTERS:
+        center_pt = points[f"house_{end_label}_center"][0]
+        for name, _ in HOUSE_RADII_FT:
+            edge_point = points[f"house_{end_label}_{name}"][0]
+            radius_px = int(round(float(np.linalg.norm(center_pt - edge_point))))
             house_features.append(
                 {
                     "end": end_label,
@@ -0,0 +1,105 @@
+"""Reading and writing the lens calibration stored in a calibration directory.
+
+Sessions write a single ``calibration.json``. Directories produced earlier
+hold one ``.npy`` file per array, which the loader still understands; there
+``crop_rect.npy`` is optional and loads as ``None`` when absent.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from functools import lru_cache
+from typing import AbstractSet, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+CALIBRATION_FILE = 'calibration.json'
+LEGACY_FILES = {
+    'camera_matrix': 'camera_matrix.npy',
+    'dist_coeffs': 'dist_coeffs.npy',
+    'new_camera_matrix': 'new_camera_matrix.npy',
+}
+LEGACY_CROP_FILE = 'crop_rect.npy'
+CANDIDATE_FILES = (CALIBRATION_FILE, *LEGACY_FILES.values(), LEGACY_CROP_FILE)
+
+
+def save_calibration(
+    directory: str,
+    camera_matrix: np.ndarray,
+    dist_coeffs: np.ndarray,
+    new_camera_matrix: np.ndarray,
+    crop_rect: Sequence[int],
+) -> str:
+    path = os.path.join(directory, CALIBRATION_FILE)
+    payload = {
+        'camera_matrix': np.asarray(camera_matrix, dtype=np.float64).tolist(),
+        'dist_coeffs': np.asarray(dist_coeffs, dtype=np.float64).ravel().tolist(),
+        'new_camera_matrix': np.asarray(new_camera_matrix, dtype=np.float64).tolist(),
+        'crop_rect': [int(v) for v in crop_rect],
+    }
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(payload, handle, indent=2)
+    return path
+
+
+def calibration_files(directory: str, present: Optional[AbstractSet[str]] = None) -> Optional[List[str]]:
+    """Return the file names holding the calibration in ``directory``, or None.
+
+    ``present`` is an optional set of names already listed from ``directory``;
+    when given it is used instead of checking each file on disk.
+    """
+    def exists(name: str) -> bool:
+        if present is not None:
+            return name in present
+        return os.path.exists(os.path.join(directory, name))
+
+    if exists(CALIBRATION_FILE):
+        return [CALIBRATION_FILE]
+    names = list(LEGACY_FILES.values())
+    if all(exists(name) for name in names):
+        if exists(LEGACY_CROP_FILE):
+            names.append(LEGACY_CROP_FILE)
+        return names
+    return None
+
+
+def load_calibration(directory: str) -> Optional[Dict[str, Optional[np.ndarray]]]:
+    """Load the calibration arrays from ``directory``, or None when absent.
+
+    Parsed arrays are memoised on the files' modification times, so repeated
+    loads of an unchanged directory skip the disk; they are read-only because
+    every caller shares them.
+    """
+    files = calibration_files(directory)
+    if files is None:
+        return None
+    stamp = tuple(os.stat(os.path.join(directory, name)).st_mtime_ns for name in files)
+    return dict(_load_files(directory, tuple(files), stamp))
+
+
+@lru_cache(maxsize=32)
+def _load_files(
+    directory: str, files: Tuple[str, ...], stamp: Tuple[int, ...]
+) -> Dict[str, Optional[np.ndarray]]:
+    arrays = _read_files(directory, list(files))
+    for array in arrays.values():
+        if array is not None:
+            array.setflags(write=False)
+    return arrays
+
+
+def _read_files(directory: str, files: List[str]) -> Dict[str, Optional[np.ndarray]]:
+    if files == [CALIBRATION_FILE]:
+        with open(os.path.join(directory, CALIBRATION_FILE), 'r', encoding='utf-8') as handle:
+            data = json.load(handle)
+        return {
+            'camera_matrix': np.array(data['camera_matrix'], dtype=np.float64),
+            'dist_coeffs': np.array(data['dist_coeffs'], dtype=np.float64),
+            'new_camera_matrix': np.array(data['new_camera_matrix'], dtype=np.float64),
+            'crop_rect': np.array(data['crop_rect'], dtype=np.int32),
+        }
+    arrays = {key: np.load(os.path.join(directory, name)) for key, name in LEGACY_FILES.items()}
+    crop = LEGACY_CROP_FILE in files
+    arrays['crop_rect'] = np.load(os.path.join(directory, LEGACY_CROP_FILE)) if crop else None
+    return arrays
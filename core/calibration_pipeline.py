@@ -1,22 +1,37 @@
 from __future__ import annotations
 
+import os
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Iterable, List, Sequence, Tuple
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple
 
 import cv2
 import numpy as np
 
+from .image_io import jpeg_size
+from .jit import HAVE_NUMBA, njit, prange
+
+try:
+    from scipy.optimize import minimize  # type: ignore[import]
+except ImportError:  # SciPy is optional; without it the grid result is used as-is.
+    minimize = None
+
 
 Point = Tuple[float, float]
 Line = Sequence[Point]
 
+# Points per line used while searching the lens grid.
+MAX_SEARCH_POINTS = 256
+
 
 @dataclass
 class CalibrationResult:
     camera_matrix: np.ndarray
     dist_coeffs: np.ndarray
     new_camera_matrix: np.ndarray
-    undistorted_image: np.ndarray
+    # None unless run_calibration_pipeline(keep_full=True).
+    undistorted_image: Optional[np.ndarray]
     cropped_image: np.ndarray
     crop_rect: Tuple[int, int, int, int]
     fit_error: float
@@ -27,16 +42,45 @@ class CalibrationComputationError(RuntimeError):
     """Raised when the calibration pipeline cannot produce a result."""
 
 
+@njit(cache=True, fastmath=True)
+def _line_rms_jit(points: np.ndarray) -> float:
+    n = points.shape[0]
+    mx = 0.0
+    my = 0.0
+    for i in range(n):
+        mx += points[i, 0]
+        my += points[i, 1]
+    mx /= n
+    my /= n
+    sxx = 0.0
+    syy = 0.0
+    sxy = 0.0
+    for i in range(n):
+        dx = points[i, 0] - mx
+        dy = points[i, 1] - my
+        sxx += dx * dx
+        syy += dy * dy
+        sxy += dx * dy
+    smallest = 0.5 * ((sxx + syy) - np.sqrt((sxx - syy) ** 2 + 4.0 * sxy * sxy))
+    return np.sqrt(max(smallest, 0.0) / n)
+
+
 def _line_rms(points: np.ndarray) -> float:
-    """Returns RMS distance of points from their best-fit line."""
+    """Returns RMS distance of points from their best-fit line.
+
+    For 2D points the orthogonal residual is the smaller eigenvalue of the
+    2x2 scatter matrix, so no SVD is needed.
+    """
     if points.shape[0] < 2:
         return 0.0
-    mean = points.mean(axis=0)
-    centered = points - mean
-    _, _, vt = np.linalg.svd(centered)
-    orth = vt[1]
-    distances = centered @ orth
-    return float(np.sqrt((distances * distances).mean()))
+    if HAVE_NUMBA:
+        return float(_line_rms_jit(points))
+    centered = points - points.mean(axis=0)
+    sxx = float(np.dot(centered[:, 0], centered[:, 0]))
+    syy = float(np.dot(centered[:, 1], centered[:, 1]))
+    sxy = float(np.dot(centered[:, 0], centered[:, 1]))
+    smallest = 0.5 * ((sxx + syy) - np.sqrt((sxx - syy) ** 2 + 4.0 * sxy * sxy))
+    return float(np.sqrt(max(smallest, 0.0) / points.shape[0]))
 
 
 def _evaluate_params(
@@ -54,14 +98,240 @@ def _evaluate_params(
     K = np.array([[f, 0.0, cx], [0.0, f, cy], [0.0, 0.0, 1.0]], dtype=np.float32)
     dist = np.array([k1, k2, 0.0, 0.0, 0.0], dtype=np.float32)
 
+    # K and dist are returned to the caller, so they are built fresh; the
+    # points are expected pre-shaped by _prepare_points.
     total = 0.0
     for pts in pts_list:
-        reshaped = pts.reshape(-1, 1, 2)
-        und = cv2.undistortPoints(reshaped, K, dist, P=K).reshape(-1, 2)
+        und = cv2.undistortPoints(pts, K, dist, P=K).reshape(-1, 2)
         total += _line_rms(und)
     return total, K, dist
 
 
+def _prepare_points(lines: List[np.ndarray]) -> List[np.ndarray]:
+    """Convert each line once to the contiguous (N, 1, 2) float64 layout
+    cv2.undistortPoints works in, so repeated evaluations skip the copy."""
+    return [np.ascontiguousarray(pts, dtype=np.float64).reshape(-1, 1, 2) for pts in lines]
+
+
+def _grid_errors(
+    pts_list: List[np.ndarray],
+    image_shape: Tuple[int, int],
+    grid: np.ndarray,
+    iterations: int = 5,
+) -> np.ndarray:
+    """Sum of per-line RMS for every (f_factor, k1, k2) row of ``grid`` at once.
+
+    Mirrors ``cv2.undistortPoints`` with ``P=K`` (the same fixed-point
+    iteration count as its default criteria) but broadcasts the points across
+    the whole parameter grid, so the search is a handful of array operations
+    instead of one OpenCV call per cell and line.
+    """
+    h, w = image_shape
+    base = float(max(w, h))
+    cx = w / 2.0
+    cy = h / 2.0
+
+    points = np.concatenate(pts_list, axis=0).astype(np.float64)
+    sizes = np.array([len(pts) for pts in pts_list])
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    f = (grid[:, 0] * base)[:, None]
+    k1 = grid[:, 1][:, None]
+    k2 = grid[:, 2][:, None]
+
+    x0 = (points[:, 0] - cx)[None, :] / f
+    y0 = (points[:, 1] - cy)[None, :] / f
+    x = x0
+    y = y0
+    diverged = np.zeros(x0.shape, dtype=bool)
+    for _ in range(iterations):
+        r2 = x * x + y * y
+        icdist = 1.0 / (1.0 + (k2 * r2 + k1) * r2)
+        # OpenCV gives up on a point (keeping its distorted coordinates) once
+        # the distortion factor turns negative.
+        diverged |= icdist < 0
+        x = np.where(diverged, x0, x0 * icdist)
+        y = np.where(diverged, y0, y0 * icdist)
+    # Back to pixels, as P=K does.
+    x = x * f
+    y = y * f
+
+    # Closed-form orthogonal line-fit residual per line: the smaller
+    # eigenvalue of each line's 2x2 scatter matrix.
+    n = sizes.astype(np.float64)
+    x = x - np.repeat(np.add.reduceat(x, starts, axis=1) / n, sizes, axis=1)
+    y = y - np.repeat(np.add.reduceat(y, starts, axis=1) / n, sizes, axis=1)
+    sxx = np.add.reduceat(x * x, starts, axis=1)
+    syy = np.add.reduceat(y * y, starts, axis=1)
+    sxy = np.add.reduceat(x * y, starts, axis=1)
+    spread = np.sqrt((sxx - syy) ** 2 + 4.0 * sxy * sxy)
+    smallest = np.maximum(0.5 * ((sxx + syy) - spread), 0.0)
+    rms = np.sqrt(smallest / n)
+    rms[:, sizes < 2] = 0.0
+    return rms.sum(axis=1)
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _grid_errors_jit(points, starts, sizes, grid, base, cx, cy, iterations):
+    errors = np.zeros(grid.shape[0])
+    for g in prange(grid.shape[0]):
+        f = grid[g, 0] * base
+        k1 = grid[g, 1]
+        k2 = grid[g, 2]
+        total = 0.0
+        for line in range(starts.shape[0]):
+            n = sizes[line]
+            if n < 2:
+                continue
+            # Sums are taken relative to the line's first point so the
+            # scatter terms do not cancel catastrophically.
+            sx = sy = sxx = syy = sxy = 0.0
+            ox = oy = 0.0
+            for i in range(starts[line], starts[line] + n):
+                x0 = (points[i, 0] - cx) / f
+                y0 = (points[i, 1] - cy) / f
+                x = x0
+                y = y0
+                for _ in range(iterations):
+                    r2 = x * x + y * y
+                    icdist = 1.0 / (1.0 + (k2 * r2 + k1) * r2)
+                    if icdist < 0:
+                        x = x0
+                        y = y0
+                        break
+                    x = x0 * icdist
+                    y = y0 * icdist
+                x *= f
+                y *= f
+                if i == starts[line]:
+                    ox = x
+                    oy = y
+                dx = x - ox
+                dy = y - oy
+                sx += dx
+                sy += dy
+                sxx += dx * dx
+                syy += dy * dy
+                sxy += dx * dy
+            sxx -= sx * sx / n
+            syy -= sy * sy / n
+            sxy -= sx * sy / n
+            smallest = 0.5 * ((sxx + syy) - np.sqrt((sxx - syy) ** 2 + 4.0 * sxy * sxy))
+            total += np.sqrt(max(smallest, 0.0) / n)
+        errors[g] = total
+    return errors
+
+
+def _search_grid(
+    pts_list: List[np.ndarray],
+    image_shape: Tuple[int, int],
+    grid: np.ndarray,
+) -> np.ndarray:
+    """Score every grid cell.
+
+    With Numba the whole grid runs in one compiled kernel parallelised over
+    cells. Otherwise the NumPy scorer runs in per-thread slabs; NumPy
+    releases the GIL in the element-wise kernels, and smaller slabs stay in
+    cache."""
+    if HAVE_NUMBA:
+        h, w = image_shape
+        points = np.ascontiguousarray(np.concatenate(pts_list, axis=0), dtype=np.float64)
+        sizes = np.array([len(pts) for pts in pts_list], dtype=np.int64)
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+        return _grid_errors_jit(
+            points,
+            starts,
+            sizes,
+            np.ascontiguousarray(grid, dtype=np.float64),
+            float(max(w, h)),
+            w / 2.0,
+            h / 2.0,
+            5,
+        )
+    workers = min(os.cpu_count() or 1, len(grid))
+    if workers <= 1:
+        return _grid_errors(pts_list, image_shape, grid)
+    slabs = np.array_split(grid, workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda slab: _grid_errors(pts_list, image_shape, slab), slabs)
+        return np.concatenate(list(results))
+
+
+def _refine_combo(
+    pts_list: List[np.ndarray],
+    image_shape: Tuple[int, int],
+    grid: np.ndarray,
+    best_index: int,
+    best_err: float,
+) -> Tuple[float, float, float]:
+    """Polish k1/k2 of the best grid cell with Nelder-Mead.
+
+    The focal factor stays at the grid winner: the pixel-space residual keeps
+    shrinking as f does, so letting it float collapses the fit. k1/k2 are
+    bounded to the grid's range. Falls back to the grid cell when SciPy is
+    missing or nothing better is found.
+    """
+    f_factor, k1, k2 = (float(v) for v in grid[best_index])
+    if minimize is None:
+        return f_factor, k1, k2
+
+    def objective(ks: np.ndarray) -> float:
+        params = np.array([[f_factor, ks[0], ks[1]]])
+        err = _grid_errors(pts_list, image_shape, params)[0]
+        return float(err) if np.isfinite(err) else float("inf")
+
+    result = minimize(
+        objective,
+        x0=np.array([k1, k2]),
+        method="Nelder-Mead",
+        bounds=[
+            (float(grid[:, 1].min()), float(grid[:, 1].max())),
+            (float(grid[:, 2].min()), float(grid[:, 2].max())),
+        ],
+        options={"xatol": 1e-3, "fatol": 1e-4},
+    )
+    if not np.isfinite(result.fun) or result.fun >= best_err:
+        return f_factor, k1, k2
+    # Rounded well below xatol so the stored combo stays readable.
+    return f_factor, round(float(result.x[0]), 4), round(float(result.x[1]), 4)
+
+
+@lru_cache(maxsize=2)
+def _undistort_maps(
+    camera_matrix: bytes,
+    dist_coeffs: bytes,
+    new_camera_matrix: bytes,
+    size: Tuple[int, int],
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Keyed on the raw matrix bytes so reruns with the same parameters reuse
+    # the fixed-point maps instead of re-evaluating the distortion model.
+    map1, map2 = cv2.initUndistortRectifyMap(
+        np.frombuffer(camera_matrix, dtype=np.float64).reshape(3, 3),
+        np.frombuffer(dist_coeffs, dtype=np.float64),
+        None,
+        np.frombuffer(new_camera_matrix, dtype=np.float64).reshape(3, 3),
+        size,
+        cv2.CV_16SC2,
+    )
+    return map1, map2
+
+
+def _undistort_image(
+    img: np.ndarray,
+    camera_matrix: np.ndarray,
+    dist_coeffs: np.ndarray,
+    new_camera_matrix: np.ndarray,
+) -> np.ndarray:
+    h, w = img.shape[:2]
+    map1, map2 = _undistort_maps(
+        np.ascontiguousarray(camera_matrix, dtype=np.float64).tobytes(),
+        np.ascontiguousarray(dist_coeffs, dtype=np.float64).ravel().tobytes(),
+        np.ascontiguousarray(new_camera_matrix, dtype=np.float64).tobytes(),
+        (w, h),
+    )
+    return cv2.remap(img, map1, map2, cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+
+
 def _compute_crop_rect(
     lines: List[np.ndarray],
     camera_matrix: np.ndarray,
@@ -69,16 +339,13 @@ def _compute_crop_rect(
     new_camera_matrix: np.ndarray,
     undistorted_shape: Tuple[int, int, int],
 ) -> Tuple[int, int, int, int]:
-    all_points = []
-    for pts in lines:
-        reshaped = pts.reshape(-1, 1, 2)
-        und = cv2.undistortPoints(reshaped, camera_matrix, dist_coeffs, P=new_camera_matrix).reshape(-1, 2)
-        all_points.append(und)
-    if not all_points:
+    if not lines:
         raise CalibrationComputationError("No points available to compute crop rectangle")
 
-    stacked = np.vstack(all_points).astype(np.float32)
-    hull = cv2.convexHull(stacked)
+    # All lines share the same camera model, so undistort them in one call.
+    stacked = np.concatenate(lines, axis=0).reshape(-1, 1, 2).astype(np.float32)
+    und = cv2.undistortPoints(stacked, camera_matrix, dist_coeffs, P=new_camera_matrix).reshape(-1, 2)
+    hull = cv2.convexHull(und)
     x, y, w, h = cv2.boundingRect(hull)
 
     img_h, img_w = undistorted_shape[:2]
@@ -89,19 +356,66 @@ def _compute_crop_rect(
     return int(x), int(y), int(w), int(h)
 
 
+def _subsample_line(pts: np.ndarray, limit: int = MAX_SEARCH_POINTS) -> np.ndarray:
+    if len(pts) <= limit:
+        return pts
+    return pts[np.linspace(0, len(pts) - 1, limit).astype(int)]
+
+
+def _fit_lens(
+    converted: List[np.ndarray],
+    image_shape: Tuple[int, int],
+    grid: np.ndarray,
+    refine: bool,
+) -> Tuple[float, np.ndarray, np.ndarray, Tuple[float, float, float]]:
+    # Line RMS is a statistic, so evenly spaced samples rank the candidates
+    # just as well as dense auto-detected lines; the winner is re-scored on
+    # every point below.
+    search_lines = [_subsample_line(pts) for pts in converted]
+    errors = _search_grid(search_lines, image_shape, grid)
+    if not np.isfinite(errors).any():
+        raise CalibrationComputationError("Failed to determine camera parameters")
+
+    best_index = int(np.nanargmin(errors))
+    best_combo = tuple(float(v) for v in grid[best_index])
+    if refine:
+        best_combo = _refine_combo(search_lines, image_shape, grid, best_index, float(errors[best_index]))
+    # Re-score the winner through OpenCV so fit_error and the returned K/dist
+    # come from the same undistortPoints path as the rest of the pipeline.
+    best_err, best_K, best_dist = _evaluate_params(_prepare_points(converted), image_shape, *best_combo)
+    return best_err, best_K, best_dist, best_combo
+
+
 def run_calibration_pipeline(
     image_path: str,
     lines: Iterable[Line],
     *,
+    image: np.ndarray | None = None,
     f_factors: Sequence[float] | None = None,
     k1_values: Sequence[float] | None = None,
     k2_values: Sequence[float] | None = None,
+    refine: bool = True,
+    keep_full: bool = False,
 ) -> CalibrationResult:
-    """Runs the undistort+crop pipeline and returns all intermediate artifacts."""
+    """Runs the undistort+crop pipeline and returns all intermediate artifacts.
+
+    The f/k1/k2 grid is scored in one vectorised pass; with ``refine`` (and
+    SciPy installed) the best cell then seeds a Nelder-Mead search. Pass
+    ``image`` when the frame is already decoded to skip reading
+    ``image_path`` again. The full undistorted frame is only kept on the
+    result with ``keep_full``; otherwise just the (owned) crop survives.
+    """
 
-    img = cv2.imread(image_path)
+    img = image
+    size = None
     if img is None:
-        raise CalibrationComputationError(f"Unable to read calibration image at {image_path}")
+        # The search only needs the frame size; decode pixels afterwards.
+        size = jpeg_size(image_path)
+        if size is None:
+            img = cv2.imread(image_path)
+            if img is None:
+                raise CalibrationComputationError(f"Unable to read calibration image at {image_path}")
+    h, w = img.shape[:2] if img is not None else (size[1], size[0])
 
     converted: List[np.ndarray] = []
     for line in lines:
@@ -119,32 +433,33 @@ def run_calibration_pipeline(
     if k2_values is None:
         k2_values = [-0.10, -0.05, 0.0, 0.05]
 
-    best_err = None
-    best_combo = None
-    best_K = None
-    best_dist = None
+    grid = np.array(
+        [(f_factor, k1, k2) for f_factor in f_factors for k1 in k1_values for k2 in k2_values],
+        dtype=np.float64,
+    )
+    if grid.size == 0:
+        raise CalibrationComputationError("Failed to determine camera parameters")
 
-    h, w = img.shape[:2]
+    best_err, best_K, best_dist, best_combo = _fit_lens(converted, (h, w), grid, refine)
 
-    for f_factor in f_factors:
-        for k1 in k1_values:
-            for k2 in k2_values:
-                err, K, dist = _evaluate_params(converted, (h, w), f_factor, k1, k2)
-                if best_err is None or err < best_err:
-                    best_err = err
-                    best_combo = (f_factor, k1, k2)
-                    best_K = K
-                    best_dist = dist
-
-    if best_K is None or best_dist is None or best_err is None or best_combo is None:
-        raise CalibrationComputationError("Failed to determine camera parameters")
+    if img is None:
+        img = cv2.imread(image_path)
+        if img is None:
+            raise CalibrationComputationError(f"Unable to read calibration image at {image_path}")
+        if img.shape[:2] != (h, w):
+            # EXIF rotation swapped the axes; refit against the decoded frame.
+            h, w = img.shape[:2]
+            best_err, best_K, best_dist, best_combo = _fit_lens(converted, (h, w), grid, refine)
 
     new_K, _ = cv2.getOptimalNewCameraMatrix(best_K, best_dist, (w, h), 1.0)
-    undistorted = cv2.undistort(img, best_K, best_dist, None, new_K)
+    undistorted = _undistort_image(img, best_K, best_dist, new_K)
 
     crop_rect = _compute_crop_rect(converted, best_K, best_dist, new_K, undistorted.shape)
     x, y, cw, ch = crop_rect
-    cropped = undistorted[y : y + ch, x : x + cw]
+    # Copy so the crop does not pin the full-size buffer.
+    cropped = undistorted[y : y + ch, x : x + cw].copy()
+    if not keep_full:
+        undistorted = None
 
     return CalibrationResult(
         camera_matrix=best_K,
@@ -1,30 +1,34 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Iterable, List, Sequence
 
-import cv2
 import numpy as np
 from django.conf import settings
 from django.core.files import File
+from django.core.files.base import ContentFile
 from django.db import transaction
 
 from .auto_calibration import generate_auto_calibration
+from .calibration_files import save_calibration
 from .calibration_pipeline import CalibrationComputationError, run_calibration_pipeline
+from .image_io import encode_jpeg
 from .models import CalibrationLinePoint, CalibrationSession
 
 SESSION_OUTPUT_ROOT = os.path.join(settings.BASE_DIR, 'calibration', 'sessions')
 
 
-def _normalize_lines(lines: Iterable[Sequence[Sequence[float]]]) -> List[List[tuple[int, int]]]:
-    normalized: List[List[tuple[int, int]]] = []
+def _normalize_lines(lines: Iterable[Sequence[Sequence[float]]]) -> List[np.ndarray]:
+    """Round every line to an (N, 2) int32 pixel array, dropping empty lines."""
+    normalized: List[np.ndarray] = []
     for line in lines:
-        converted = []
-        for point in line:
-            if len(point) < 2:
-                continue
-            x, y = int(round(point[0])), int(round(point[1]))
-            converted.append((x, y))
-        if converted:
-            normalized.append(converted)
+        try:
+            pts = np.asarray(line, dtype=np.float64)
+        except ValueError:
+            # Ragged input: keep only points that carry both coordinates.
+            pts = np.asarray([point[:2] for point in line if len(point) >= 2], dtype=np.float64)
+        if pts.ndim != 2 or pts.shape[1] < 2 or len(pts) == 0:
+            continue
+        normalized.append(np.rint(pts[:, :2]).astype(np.int32))
     return normalized
 
 
@@ -32,10 +36,18 @@ def create_calibration_session(
     camera,
     image_path: str,
     lines: Iterable[Sequence[Sequence[float]]] | None = None,
+    frame: np.ndarray | None = None,
+    full_preview: bool = False,
 ):
+    """Run auto-calibration for ``image_path`` and store a pending session.
+
+    ``frame`` is the already-decoded image when the caller just captured it;
+    the file on disk is then only attached, never decoded. ``full_preview``
+    also stores the uncropped undistorted frame.
+    """
     auto_features = {}
     if lines is None:
-        auto_result = generate_auto_calibration(image_path)
+        auto_result = generate_auto_calibration(image_path, image=frame)
         lines = auto_result.lines
         auto_features = auto_result.features
 
@@ -43,14 +55,21 @@ def create_calibration_session(
     if not cleaned_lines:
         raise CalibrationComputationError('No calibration lines supplied.')
 
-    with transaction.atomic():
-        session = CalibrationSession.objects.create(camera=camera)
+    # The source is opened before the row exists, so a missing file cannot
+    # leave an empty pending session behind.
+    with open(image_path, 'rb') as source:
+        with transaction.atomic():
+            session = CalibrationSession.objects.create(camera=camera)
+        try:
+            session.source_image.save(os.path.basename(image_path), File(source), save=True)
+        except Exception:
+            session.delete()
+            raise
 
-    _attach_source_image(session, image_path)
     _persist_line_points(session, cleaned_lines)
 
-    result = run_calibration_pipeline(image_path, cleaned_lines)
-    artifact_dir = _write_session_artifacts(session, result)
+    result = run_calibration_pipeline(image_path, cleaned_lines, image=frame, keep_full=full_preview)
+    artifact_dir = _write_session_artifacts(session, result, full_preview=full_preview)
     rel_dir = os.path.relpath(artifact_dir, settings.BASE_DIR)
 
     x, y, w, h = result.crop_rect
@@ -69,42 +88,62 @@ def create_calibration_session(
     return session
 
 
-def _attach_source_image(session, image_path: str):
-    with open(image_path, 'rb') as handle:
-        session.source_image.save(os.path.basename(image_path), File(handle), save=True)
+def _persist_line_points(session, lines: List[np.ndarray]):
+    # session_id skips the FK descriptor on every instance; one transaction
+    # covers all batches.
+    records = (
+        CalibrationLinePoint(
+            session_id=session.id,
+            line_index=line_index,
+            point_index=point_index,
+            x=x,
+            y=y,
+        )
+        for line_index, line in enumerate(lines)
+        for point_index, (x, y) in enumerate(line.tolist())
+    )
+    with transaction.atomic():
+        CalibrationLinePoint.objects.bulk_create(records, batch_size=500)
+
 
+def _encode_jpeg(image) -> bytes:
+    data = encode_jpeg(image)
+    if data is None:
+        raise CalibrationComputationError('Failed to encode calibration preview.')
+    return data
 
-def _persist_line_points(session, lines: List[List[tuple[int, int]]]):
-    records = []
-    for line_index, line in enumerate(lines):
-        for point_index, (x, y) in enumerate(line):
-            records.append(
-                CalibrationLinePoint(
-                    session=session,
-                    line_index=line_index,
-                    point_index=point_index,
-                    x=x,
-                    y=y,
-                )
-            )
-    CalibrationLinePoint.objects.bulk_create(records)
 
+def _write_session_artifacts(session, result, full_preview: bool = False):
+    """Store the calibration bundle and previews for review.
 
-def _write_session_artifacts(session, result):
+    The cropped preview is all the review page shows; the full undistorted
+    frame is only encoded when ``full_preview`` is set.
+    """
     session_dir = os.path.join(SESSION_OUTPUT_ROOT, f'session_{session.id}')
     os.makedirs(session_dir, exist_ok=True)
 
-    np.save(os.path.join(session_dir, 'camera_matrix.npy'), result.camera_matrix)
-    np.save(os.path.join(session_dir, 'dist_coeffs.npy'), result.dist_coeffs)
-    np.save(os.path.join(session_dir, 'new_camera_matrix.npy'), result.new_camera_matrix)
-    np.save(os.path.join(session_dir, 'crop_rect.npy'), np.array(result.crop_rect, dtype=np.int32))
-
-    undist_path = os.path.join(session_dir, 'undistorted_preview.jpg')
-    rectified_path = os.path.join(session_dir, 'rectified_preview.jpg')
-    cv2.imwrite(undist_path, result.undistorted_image)
-    cv2.imwrite(rectified_path, result.cropped_image)
-
-    with open(rectified_path, 'rb') as handle:
-        session.rectified_preview.save(os.path.basename(rectified_path), File(handle), save=True)
+    save_calibration(
+        session_dir,
+        result.camera_matrix,
+        result.dist_coeffs,
+        result.new_camera_matrix,
+        result.crop_rect,
+    )
+
+    previews = {'rectified_preview.jpg': result.cropped_image}
+    if full_preview and result.undistorted_image is not None:
+        previews['undistorted_preview.jpg'] = result.undistorted_image
+    # JPEG encoding releases the GIL, so the two previews encode in parallel.
+    with ThreadPoolExecutor(max_workers=len(previews)) as pool:
+        encoded = dict(zip(previews, pool.map(_encode_jpeg, previews.values())))
+    for name, data in encoded.items():
+        with open(os.path.join(session_dir, name), 'wb') as handle:
+            handle.write(data)
+
+    session.rectified_preview.save(
+        'rectified_preview.jpg',
+        ContentFile(encoded['rectified_preview.jpg']),
+        save=True,
+    )
 
     return session_dir
@@ -1,20 +1,42 @@
 from __future__ import annotations
 
 import os
+import threading
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Optional, Tuple
 
 import cv2  # type: ignore[import]
 import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.base import ContentFile
+from django.db import connection
 
+from .image_io import encode_jpeg, update_latest_alias
 from .models import Camera, CapturedFrame
-from .utils import open_camera
+from .utils import ensure_dir, open_camera
 
 CAPTURED_FRAMES_DIR = os.path.join(settings.BASE_DIR, 'captured_frames')
+REFERENCE_CAPTURE_DIR = os.path.join(settings.BASE_DIR, 'calibration', 'sessions', 'captures')
 LATEST_FRAME_ALIAS = 'latest_frame.jpg'
+SEED_LOCK_TTL = 60  # Upper bound on a background capture holding its lock
+SEED_RETRY_DELAY = 30  # Seconds to wait before retrying a failed capture
+
+_http_local = threading.local()
+
+
+def _http_session() -> requests.Session:
+    """Per-thread keep-alive session so repeated snapshots reuse connections."""
+    session = getattr(_http_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _http_local.session = session
+    return session
 
 
 class CameraFrameSource:
@@ -24,6 +46,10 @@ class CameraFrameSource:
         self.camera = camera
         self.snapshot_timeout = snapshot_timeout
         self._cap: Optional[cv2.VideoCapture] = None
+        self._source_shape: Optional[Tuple[int, int]] = None
+        self._small: Optional[np.ndarray] = None
+        self._small_gray: Optional[np.ndarray] = None
+        self._last_snapshot: Optional[bytes] = None
 
     def __enter__(self):
         self.open()
@@ -52,41 +78,168 @@ class CameraFrameSource:
             raise RuntimeError("Failed to grab a frame from the selected camera.")
         return frame
 
+    def read_gray(
+        self, size: Tuple[int, int], dst: Optional[np.ndarray] = None
+    ) -> Tuple[Optional[np.ndarray], Optional[Callable[[], np.ndarray]]]:
+        """Return a small grayscale frame for change detection and a colour loader.
+
+        HTTP snapshots are decoded straight to gray at a reduced JPEG scale, and
+        the full-colour decode only happens if the loader is called. Device
+        frames arrive as BGR, so the green channel stands in for luma instead of
+        a colour conversion. Both paths finish with an area-averaging resize,
+        which keeps sensor noise out of the comparison.
+
+        ``dst`` is an optional ``(height, width)`` uint8 buffer to write the gray
+        frame into, so polling loops can recycle buffers instead of allocating.
+
+        Snapshot endpoints often serve the same still until the sensor
+        refreshes; when the bytes match the previous fetch nothing is decoded
+        and ``(None, None)`` is returned.
+        """
+        if self.camera.snapshot_url:
+            data = self._fetch_snapshot(self.camera.snapshot_url)
+            if data == self._last_snapshot:
+                return None, None
+            self._last_snapshot = data
+            buffer = np.frombuffer(data, dtype=np.uint8)
+            gray = cv2.imdecode(buffer, self._gray_decode_flag(size))
+            if gray is None:
+                raise RuntimeError("Snapshot endpoint did not return a valid image.")
+            if self._source_shape is None:
+                self._source_shape = gray.shape[:2]
+            small = cv2.resize(gray, size, dst=dst, interpolation=cv2.INTER_AREA)
+            return small, lambda: self._decode_color(data)
+        frame = self.read()
+        # Point-sample to twice the target first: INTER_AREA over the full
+        # frame would read every source pixel.
+        width, height = size
+        self._small = cv2.resize(frame, (width * 2, height * 2), dst=self._small, interpolation=cv2.INTER_NEAREST)
+        self._small_gray = cv2.extractChannel(self._small, 1, dst=self._small_gray)
+        return cv2.resize(self._small_gray, size, dst=dst, interpolation=cv2.INTER_AREA), lambda: frame
+
+    def _gray_decode_flag(self, size: Tuple[int, int]) -> int:
+        # libjpeg can scale by 1/2, 1/4 or 1/8 during decoding; pick the
+        # smallest scale that still covers the comparison size.
+        if self._source_shape is not None:
+            height, width = self._source_shape
+            for factor, flag in (
+                (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+                (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+                (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+            ):
+                if width // factor >= size[0] and height // factor >= size[1]:
+                    return flag
+        return cv2.IMREAD_GRAYSCALE
+
     def release(self) -> None:
         if self._cap is not None:
             self._cap.release()
             self._cap = None
 
-    def _read_http_frame(self, url: str):
+    def _fetch_snapshot(self, url: str) -> bytes:
         try:
-            response = requests.get(url, timeout=self.snapshot_timeout)
+            response = _http_session().get(url, timeout=self.snapshot_timeout)
             response.raise_for_status()
         except requests.RequestException as exc:
             raise RuntimeError(f"Failed to fetch snapshot from {url}: {exc}") from exc
-        buffer = np.frombuffer(response.content, dtype=np.uint8)
-        frame = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+        return response.content
+
+    def _decode_color(self, data: bytes):
+        frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
         if frame is None:
             raise RuntimeError("Snapshot endpoint did not return a valid image.")
         return frame
 
+    def _read_http_frame(self, url: str):
+        return self._decode_color(self._fetch_snapshot(url))
+
+
+def capture_single_frame(camera, return_image=False):
+    """Grab a single frame from the given camera and persist it for calibration.
 
-def capture_single_frame(camera):
-    """Grab a single frame from the given camera and persist it for calibration."""
+    With ``return_image`` the decoded frame is returned alongside the
+    ``CapturedFrame`` so callers can use it without reading the JPEG back.
+    """
     with CameraFrameSource(camera) as source:
         frame = source.read()
 
-    os.makedirs(CAPTURED_FRAMES_DIR, exist_ok=True)
+    ensure_dir(CAPTURED_FRAMES_DIR)
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     raw_name = f"sheet{camera.sheet.number}_{camera.side}_{timestamp}.jpg"
     raw_disk_path = os.path.join(CAPTURED_FRAMES_DIR, raw_name)
-    cv2.imwrite(raw_disk_path, frame)
-    cv2.imwrite(os.path.join(CAPTURED_FRAMES_DIR, LATEST_FRAME_ALIAS), frame)
-
-    success, buffer = cv2.imencode('.jpg', frame)
-    if not success:
+    # Encode once; the same bytes go to disk, the latest alias and the model.
+    data = encode_jpeg(frame)
+    if data is None:
         raise RuntimeError("Failed to encode captured frame to JPEG.")
+    with open(raw_disk_path, 'wb') as handle:
+        handle.write(data)
+    update_latest_alias(raw_disk_path, os.path.join(CAPTURED_FRAMES_DIR, LATEST_FRAME_ALIAS), data)
 
-    return CapturedFrame.objects.create(
+    captured = CapturedFrame.objects.create(
         camera=camera,
-        image=ContentFile(buffer.tobytes(), name=f"raw/{raw_name}"),
+        image=ContentFile(data, name=f"raw/{raw_name}"),
     )
+    if return_image:
+        return captured, frame
+    return captured
+
+
+def seed_frame_in_background(camera) -> Optional[str]:
+    """Capture a first still for ``camera`` on a worker thread.
+
+    A cache ``add`` acts as a per-camera lock so concurrent page loads start
+    one capture between them. If a recent attempt failed its message is
+    returned instead of retrying straight away; otherwise None, meaning a
+    capture is (or already was) running.
+    """
+    if camera.device_index is None and not (camera.snapshot_url or '').strip():
+        # Nothing to open; fail here rather than spawning a doomed capture.
+        return "Camera has no device index configured and snapshot URL is empty."
+    error = cache.get(f'core:seed_error:{camera.pk}')
+    if error:
+        return error
+    lock_key = f'core:seeding:{camera.pk}'
+    if cache.add(lock_key, True, SEED_LOCK_TTL):
+        threading.Thread(
+            target=_seed_frame,
+            args=(camera.pk, lock_key),
+            name=f'seed-frame-{camera.pk}',
+            daemon=True,
+        ).start()
+    return None
+
+
+def _seed_frame(camera_id, lock_key):
+    try:
+        camera = Camera.objects.select_related('sheet').get(pk=camera_id)
+        capture_single_frame(camera)
+    except Exception as exc:
+        # Record every failure; otherwise the page keeps reloading and
+        # starting fresh captures without ever showing why they fail.
+        cache.set(f'core:seed_error:{camera_id}', str(exc) or type(exc).__name__, SEED_RETRY_DELAY)
+    finally:
+        cache.delete(lock_key)
+        connection.close()
+
+
+def capture_reference_frame(camera):
+    """Grab a calibration reference still and return ``(path, frame)``.
+
+    The still goes under ``calibration/sessions/captures`` and the latest
+    alias is refreshed; no ``CapturedFrame`` row is created.
+    """
+    with CameraFrameSource(camera) as source:
+        frame = source.read()
+
+    ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+    ensure_dir(REFERENCE_CAPTURE_DIR)
+    capture_path = os.path.join(REFERENCE_CAPTURE_DIR, f'sheet{camera.sheet.number}_{camera.side}_{ts}.jpg')
+    data = encode_jpeg(frame)
+    if data is None:
+        raise RuntimeError("Failed to encode captured frame to JPEG.")
+    with open(capture_path, 'wb') as handle:
+        handle.write(data)
+
+    ensure_dir(CAPTURED_FRAMES_DIR)
+    update_latest_alias(capture_path, os.path.join(CAPTURED_FRAMES_DIR, LATEST_FRAME_ALIAS), data)
+    return capture_path, frame
@@ -0,0 +1,148 @@
+"""Image loading and JPEG encoding helpers.
+
+PyTurboJPEG is optional. When it and libjpeg-turbo are available, JPEGs are
+decoded and encoded through its SIMD path; anything else (missing library,
+PNGs, corrupt files) goes through ``cv2.imread``/``cv2.imencode`` so callers
+keep their ``None``-on-failure contract.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import struct
+import threading
+from typing import Optional, Tuple
+
+import cv2  # type: ignore[import]
+import numpy as np
+
+try:
+    from turbojpeg import TJPF_BGR, TJPF_GRAY, TJSAMP_420, TurboJPEG  # type: ignore[import]
+
+    _tj = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    _tj = None
+    TJPF_BGR = TJPF_GRAY = TJSAMP_420 = None
+
+HAVE_TURBOJPEG = _tj is not None
+
+_JPEG_SUFFIXES = ('.jpg', '.jpeg', '.jpe')
+
+
+def _turbo_decode(path: str, pixel_format) -> Optional[np.ndarray]:
+    if _tj is None or not os.fspath(path).lower().endswith(_JPEG_SUFFIXES):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            return _tj.decode(f.read(), pixel_format=pixel_format)
+    except (OSError, ValueError):
+        return None
+
+
+def fast_imread(path: str) -> Optional[np.ndarray]:
+    """Read a BGR image, preferring libjpeg-turbo for JPEG files."""
+    image = _turbo_decode(path, TJPF_BGR)
+    if image is None:
+        image = cv2.imread(path)
+    return image
+
+
+def fast_imread_gray(path: str) -> Optional[np.ndarray]:
+    """Read a single-channel image straight from the decoder, skipping cvtColor."""
+    image = _turbo_decode(path, TJPF_GRAY)
+    if image is None:
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    elif image.ndim == 3:
+        image = image[:, :, 0]
+    return image
+
+
+def encode_jpeg(image: np.ndarray, quality: int = 95) -> Optional[bytes]:
+    """Encode a BGR or grayscale image to JPEG bytes, or None on failure.
+
+    Colour frames go through libjpeg-turbo when available, with the same 4:2:0
+    subsampling and default quality as ``cv2.imencode``.
+    """
+    if _tj is not None and image.ndim == 3 and image.shape[2] == 3:
+        try:
+            return _tj.encode(
+                np.ascontiguousarray(image),
+                quality=quality,
+                pixel_format=TJPF_BGR,
+                jpeg_subsample=TJSAMP_420,
+            )
+        except (OSError, ValueError):
+            pass
+    success, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not success:
+        return None
+    return buffer.tobytes()
+
+
+# Start-of-frame markers carry the image size; C4/C8/CC share the range but
+# are Huffman/arithmetic tables, not frame headers.
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_size(path: str) -> Optional[Tuple[int, int]]:
+    """Return (width, height) from a JPEG's frame header without decoding it.
+
+    Returns None for anything that is not a readable baseline/progressive
+    JPEG, so callers can fall back to a full decode. EXIF orientation is not
+    applied; compare against the decoded image if that matters.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if f.read(2) != b'\xff\xd8':
+                return None
+            while True:
+                byte = f.read(1)
+                while byte == b'\xff':
+                    marker = f.read(1)
+                    if marker != b'\xff':
+                        break
+                else:
+                    return None
+                if not marker:
+                    return None
+                code = marker[0]
+                if code == 0x01 or 0xD0 <= code <= 0xD7:
+                    continue  # Standalone markers have no length field.
+                length_bytes = f.read(2)
+                if len(length_bytes) != 2:
+                    return None
+                (length,) = struct.unpack('>H', length_bytes)
+                if code in _SOF_MARKERS:
+                    header = f.read(5)
+                    if len(header) != 5:
+                        return None
+                    _, height, width = struct.unpack('>BHH', header)
+                    return width, height
+                if code in (0xD9, 0xDA):
+                    return None  # Reached image data without a frame header.
+                f.seek(length - 2, os.SEEK_CUR)
+    except OSError:
+        return None
+
+
+def update_latest_alias(source_path: str, alias_path: str, data: Optional[bytes] = None) -> None:
+    """Point ``alias_path`` at ``source_path`` without re-encoding.
+
+    The alias is a hard link built under a temporary name and swapped in with
+    ``os.replace``, so readers never see a half-written file. Filesystems
+    without hard links (FAT/exFAT, some network shares) get a copy of
+    ``data`` instead, or of ``source_path`` itself when no bytes are given.
+    """
+    tmp_path = f"{alias_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(source_path, tmp_path)
+    except OSError:
+        if data is None:
+            shutil.copy2(source_path, tmp_path)
+        else:
+            with open(tmp_path, 'wb') as handle:
+                handle.write(data)
+    os.replace(tmp_path, alias_path)
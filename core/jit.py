@@ -0,0 +1,22 @@
+"""Optional Numba support.
+
+Numba is not a hard dependency. When it is missing, ``njit`` leaves functions
+as plain Python and callers check ``HAVE_NUMBA`` to pick a vectorised fallback.
+"""
+
+try:
+    from numba import njit, prange  # type: ignore[import]
+
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+
+        return decorator
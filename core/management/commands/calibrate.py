@@ -1,21 +1,14 @@
-import cv2
 import os
-from datetime import datetime
 
-from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.core.management.base import CommandError
 
 from core.calibration_pipeline import CalibrationComputationError
 from core.calibration_service import create_calibration_session
-from core.capture_utils import CameraFrameSource
+from core.capture_utils import capture_reference_frame
 from core.models import Camera
 
 
-CAPTURED_FRAMES_DIR = os.path.join(settings.BASE_DIR, 'captured_frames')
-LATEST_FRAME_ALIAS = 'latest_frame.jpg'
-SESSION_OUTPUT_ROOT = os.path.join(settings.BASE_DIR, 'calibration', 'sessions')
-
 class Command(BaseCommand):
     help = 'Runs interactive calibration for a camera'
 
@@ -35,14 +28,15 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS(f"Starting calibration for {camera}"))
         image_path = options.get('image')
+        frame = None
         if image_path:
             if not os.path.exists(image_path):
                 raise CommandError(f"Could not find reference image at {image_path}")
         else:
-            image_path = self._capture_reference_frame(camera)
+            image_path, frame = self._capture_reference_frame(camera)
 
         try:
-            session = create_calibration_session(camera, image_path)
+            session = create_calibration_session(camera, image_path, frame=frame)
         except CalibrationComputationError as exc:
             raise CommandError(str(exc)) from exc
 
@@ -52,21 +46,10 @@ class Command(BaseCommand):
 
     def _capture_reference_frame(self, camera):
         try:
-            with CameraFrameSource(camera) as source:
-                frame = source.read()
+            capture_path, frame = capture_reference_frame(camera)
         except RuntimeError as exc:
             raise CommandError(str(exc)) from exc
-
-        ts = datetime.now().strftime('%Y%m%d_%H%M%S')
-        capture_dir = os.path.join(SESSION_OUTPUT_ROOT, 'captures')
-        os.makedirs(capture_dir, exist_ok=True)
-        capture_path = os.path.join(capture_dir, f'sheet{camera.sheet.number}_{camera.side}_{ts}.jpg')
-        cv2.imwrite(capture_path, frame)
-
-        os.makedirs(CAPTURED_FRAMES_DIR, exist_ok=True)
-        latest_path = os.path.join(CAPTURED_FRAMES_DIR, LATEST_FRAME_ALIAS)
-        cv2.imwrite(latest_path, frame)
         self.stdout.write(f"Stored reference frame at {capture_path} (latest alias updated)")
-        return capture_path
+        return capture_path, frame
 
     # Manual tracing removed; calibration is now fully automatic.
@@ -2,57 +2,221 @@ import cv2
 import json
 import numpy as np
 import os
+import queue
+import threading
 import time
-from datetime import datetime
 from django.conf import settings
 from django.core.files.base import ContentFile
 from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from core.calibration_files import load_calibration
 from core.capture_utils import CameraFrameSource
+from core.image_io import encode_jpeg, update_latest_alias
 from core.models import Camera, CapturedFrame
+from core.rectification import cached_rectify_maps, cuda_available, translation
+from core.utils import ensure_dir
 
 
 CAPTURED_FRAMES_DIR = os.path.join(settings.BASE_DIR, 'captured_frames')
 RECTIFIED_SUBDIR = 'rectified'
+REMAP_CACHE_DIR = os.path.join(settings.BASE_DIR, 'remap_cache')
 LATEST_FRAME_ALIAS = 'latest_frame.jpg'
 LATEST_RECTIFIED_ALIAS = 'latest_rectified.jpg'
-COMPARE_SIZE = (320, 180)
+COMPARE_SIZE = (160, 90)  # Change detection runs on an area-averaged thumbnail
+WRITE_QUEUE_SIZE = 4
+WRITE_BATCH_SIZE = 8
+WRITE_FLUSH_INTERVAL = 2.0  # Seconds a saved frame may wait for its row
 
 
 class FrameCropper:
-    def __init__(self, crop_rect_path):
-        rect = np.load(crop_rect_path).reshape(-1)
+    def __init__(self, crop_rect):
+        rect = np.asarray(crop_rect).astype(np.int32, copy=False).ravel()
         if rect.size != 4:
-            raise ValueError(f"Crop rectangle at {crop_rect_path} must have four entries (x, y, w, h)")
-        self.x, self.y, self.w, self.h = [int(v) for v in rect]
+            raise ValueError("Crop rectangle must have four entries (x, y, w, h)")
+        self.x, self.y, self.w, self.h = rect.tolist()
+        self._slice = (slice(self.y, self.y + self.h), slice(self.x, self.x + self.w))
 
     def __call__(self, frame):
-        return frame[self.y:self.y + self.h, self.x:self.x + self.w]
+        return frame[self._slice]
 
 
 class FrameRectifier:
+    """Undistort, warp and crop a frame with a single ``cv2.remap``.
+
+    The three steps are folded into one lookup table the first time a frame
+    of a given size arrives (the output size can default to the frame size),
+    and the table is cached on disk keyed by the calibration it came from.
+    On CUDA builds of OpenCV the remap runs on the GPU, reusing the uploaded
+    maps and device buffers across frames.
+    """
+
     def __init__(
         self,
-        camera_matrix_path,
-        dist_coeffs_path,
-        new_camera_matrix_path,
-        homography_path,
+        camera_matrix,
+        dist_coeffs,
+        new_camera_matrix,
+        homography,
         output_size,
         cropper=None,
+        use_gpu=True,
     ):
-        self.K = np.load(camera_matrix_path)
-        self.dist = np.load(dist_coeffs_path)
-        self.newK = np.load(new_camera_matrix_path)
-        self.H = np.load(homography_path)
+        self.K = camera_matrix
+        self.dist = dist_coeffs
+        self.newK = new_camera_matrix
+        self.H = homography
         self.output_size = output_size
         self.cropper = cropper
+        # cv2.cuda.remap only accepts float maps; the CPU path uses fixed-point.
+        self.use_gpu = use_gpu and cuda_available()
+        self._maps = {}
+        self._gpu_frame = cv2.cuda_GpuMat() if self.use_gpu else None
+
+    def _maps_for(self, frame_size):
+        target_size = self.output_size or frame_size
+        maps = self._maps.get(target_size)
+        if maps is None:
+            # The crop is taken from the warped image, so it becomes a
+            # translation of the output grid, clipped like the array slice.
+            inverse_warp = np.linalg.inv(self.H)
+            out_w, out_h = target_size
+            if self.cropper:
+                c = self.cropper
+                x0, y0 = min(c.x, out_w), min(c.y, out_h)
+                out_w = min(c.x + c.w, target_size[0]) - x0
+                out_h = min(c.y + c.h, target_size[1]) - y0
+                inverse_warp = inverse_warp @ translation(x0, y0)
+            maps = cached_rectify_maps(
+                REMAP_CACHE_DIR,
+                self.K,
+                self.dist,
+                self.newK,
+                inverse_warp,
+                (out_w, out_h),
+                map_type=cv2.CV_32FC1 if self.use_gpu else cv2.CV_16SC2,
+            )
+            if self.use_gpu:
+                gpu_map1 = cv2.cuda_GpuMat()
+                gpu_map1.upload(maps[0])
+                gpu_map2 = cv2.cuda_GpuMat()
+                gpu_map2.upload(maps[1])
+                maps = (gpu_map1, gpu_map2, cv2.cuda_GpuMat())
+            self._maps[target_size] = maps
+        return maps
 
     def __call__(self, frame):
-        target_size = self.output_size or (frame.shape[1], frame.shape[0])
-        undistorted = cv2.undistort(frame, self.K, self.dist, None, self.newK)
-        warped = cv2.warpPerspective(undistorted, self.H, target_size)
-        if self.cropper:
-            warped = self.cropper(warped)
-        return warped
+        maps = self._maps_for((frame.shape[1], frame.shape[0]))
+        if self.use_gpu:
+            gpu_map1, gpu_map2, gpu_out = maps
+            self._gpu_frame.upload(frame)
+            cv2.cuda.remap(
+                self._gpu_frame,
+                gpu_map1,
+                gpu_map2,
+                cv2.INTER_LINEAR,
+                dst=gpu_out,
+                borderMode=cv2.BORDER_CONSTANT,
+            )
+            return gpu_out.download()
+        map1, map2 = maps
+        return cv2.remap(frame, map1, map2, cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+
+
+class FrameWriter:
+    """Persists captured frames on a background thread.
+
+    The capture loop hands frames over with ``submit`` and goes straight back
+    to polling; JPEG encoding and file writes release the GIL, so they overlap
+    with the next camera read. The queue is bounded and drops its oldest frame
+    rather than blocking the loop, and ``close`` drains whatever is left.
+
+    ``persist`` writes the files and returns an unsaved record (or None);
+    records are handed to ``flush`` in batches of ``batch_size`` or after
+    ``flush_interval`` seconds, whichever comes first. Exceptions from either
+    callback go to ``on_error`` and the writer keeps running.
+    """
+
+    def __init__(
+        self,
+        persist,
+        flush,
+        on_error,
+        maxsize=WRITE_QUEUE_SIZE,
+        batch_size=WRITE_BATCH_SIZE,
+        flush_interval=WRITE_FLUSH_INTERVAL,
+    ):
+        self._persist = persist
+        self._flush = flush
+        self._on_error = on_error
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._pending = []
+        self._flush_deadline = None
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name='frame-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, *item):
+        """Queue ``item`` for ``persist``; return False if an older frame was dropped."""
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+        try:
+            self._queue.get_nowait()
+            self._queue.task_done()
+        except queue.Empty:
+            pass
+        self._queue.put_nowait(item)
+        return False
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        try:
+            while True:
+                timeout = None
+                if self._pending:
+                    timeout = max(0.0, self._flush_deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    self._flush_pending()
+                    continue
+                try:
+                    if item is None:
+                        self._flush_pending()
+                        return
+                    record = self._persist(*item)
+                    if record is not None:
+                        if not self._pending:
+                            self._flush_deadline = time.monotonic() + self._flush_interval
+                        self._pending.append(record)
+                    if len(self._pending) >= self._batch_size:
+                        self._flush_pending()
+                except Exception as exc:
+                    # Any failure costs this frame only; the thread keeps
+                    # serving the queue so later frames are still saved.
+                    self._on_error(exc)
+                finally:
+                    self._queue.task_done()
+        finally:
+            connection.close()
+
+    def _flush_pending(self):
+        if not self._pending:
+            return
+        try:
+            close_old_connections()
+            self._flush(self._pending)
+        except Exception as exc:
+            self._on_error(exc)
+        self._pending = []
+
 
 class Command(BaseCommand):
     help = 'Runs the video capture loop for a specific camera'
@@ -61,15 +225,28 @@ class Command(BaseCommand):
         parser.add_argument('--sheet', type=int, required=True, help='Sheet number')
         parser.add_argument('--camera', type=str, required=True, choices=['odd', 'even'], help='Camera side (odd/even)')
         parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between checks')
-        parser.add_argument('--threshold', type=float, default=5.0, help='Pixel difference threshold')
+        parser.add_argument('--threshold', type=float, default=5.0, help=f'Mean absolute gray difference (0-255) on the {COMPARE_SIZE[0]}x{COMPARE_SIZE[1]} thumbnail that counts as a change')
+        parser.add_argument(
+            '--pixel-threshold',
+            type=int,
+            default=0,
+            help='Count pixels whose gray difference exceeds this instead of averaging (0 = use --threshold)',
+        )
+        parser.add_argument(
+            '--changed-fraction',
+            type=float,
+            default=0.02,
+            help='With --pixel-threshold, fraction of thumbnail pixels that must change to save a frame',
+        )
         parser.add_argument('--max-frames', type=int, default=0, help='Stop after saving this many frames (0 = run indefinitely)')
+        parser.add_argument('--no-gpu', action='store_true', help='Rectify on the CPU even when CUDA is available')
 
     def handle(self, *args, **options):
         sheet_num = options['sheet']
         side = options['camera']
 
         try:
-            camera = Camera.objects.get(sheet__number=sheet_num, side=side)
+            camera = Camera.objects.select_related('sheet').get(sheet__number=sheet_num, side=side)
         except Camera.DoesNotExist:
             self.stderr.write(self.style.ERROR(f"Camera for Sheet {sheet_num} ({side}) not found in DB"))
             return
@@ -89,46 +266,82 @@ class Command(BaseCommand):
             self.stderr.write(self.style.ERROR(str(exc)))
             return
 
-        rectifier = self._build_rectifier(camera)
+        rectifier = self._build_rectifier(camera, use_gpu=not options['no_gpu'])
         if rectifier:
             self.stdout.write(self.style.SUCCESS("Calibrated pipeline loaded; rectified frames will be saved."))
         else:
             if camera.is_calibrated:
                 self.stdout.write(self.style.WARNING("Camera marked calibrated but required files were missing; saving raw frames only."))
 
+        # Two gray buffers are recycled: the current poll writes into
+        # gray_buf, and a saved frame's buffer becomes prev_gray.
         prev_gray = None
+        gray_buf = None
+        diff_buf = None
+        pixel_threshold = options['pixel_threshold']
         saved_frames = 0
 
+        writer = FrameWriter(
+            self._persist_frame,
+            self._save_records,
+            lambda exc: self.stderr.write(self.style.ERROR(f"Failed to save frame: {exc}")),
+        )
+
         try:
             while True:
                 try:
-                    frame = frame_source.read()
+                    gray, load_frame = frame_source.read_gray(COMPARE_SIZE, dst=gray_buf)
                 except RuntimeError as exc:
                     self.stderr.write(self.style.WARNING(str(exc)))
                     time.sleep(options['poll_interval'])
                     continue
-
-                gray = cv2.cvtColor(cv2.resize(frame, COMPARE_SIZE), cv2.COLOR_BGR2GRAY)
+                if gray is None:
+                    # Snapshot endpoint served the same bytes as last poll.
+                    time.sleep(options['poll_interval'])
+                    continue
 
                 save_it = False
                 mean_diff = None
                 if prev_gray is None:
                     save_it = True
+                elif pixel_threshold > 0:
+                    # Counting changed pixels ignores low-level noise spread over
+                    # the whole frame; the diff buffer is reused across polls.
+                    diff_buf = cv2.absdiff(gray, prev_gray, dst=diff_buf)
+                    cv2.threshold(diff_buf, pixel_threshold, 255, cv2.THRESH_BINARY, dst=diff_buf)
+                    changed = cv2.countNonZero(diff_buf) / diff_buf.size
+                    if changed >= options['changed_fraction']:
+                        save_it = True
+                        self.stdout.write(f"Change detected: {changed:.1%} of pixels")
                 else:
-                    diff = cv2.absdiff(gray, prev_gray)
-                    mean_diff = float(diff.mean())
+                    # NORM_L1 fuses abs-diff and sum in one SIMD pass; a Numba
+                    # loop (with or without early exit) was slower at this size.
+                    mean_diff = cv2.norm(gray, prev_gray, cv2.NORM_L1) / gray.size
                     if mean_diff >= options['threshold']:
                         save_it = True
                         self.stdout.write(f"Change detected: {mean_diff:.2f}")
 
                 if save_it:
+                    try:
+                        frame = load_frame()
+                    except RuntimeError as exc:
+                        self.stderr.write(self.style.WARNING(str(exc)))
+                        time.sleep(options['poll_interval'])
+                        continue
                     rectified_frame = rectifier(frame) if rectifier else None
-                    self._persist_frame(camera, frame, rectified_frame)
-                    prev_gray = gray
+                    # Both frames are freshly allocated each poll, so the
+                    # writer can own them without a copy.
+                    timestamp = time.strftime('%Y%m%d_%H%M%S')
+                    captured_at = timezone.now()
+                    if not writer.submit(camera, frame, rectified_frame, timestamp, captured_at):
+                        self.stderr.write(self.style.WARNING("Frame writer is behind; dropped the oldest queued frame."))
+                    prev_gray, gray_buf = gray, prev_gray
                     saved_frames += 1
                     if options['max_frames'] > 0 and saved_frames >= options['max_frames']:
                         self.stdout.write(self.style.SUCCESS("Reached max frame count; stopping."))
                         break
+                else:
+                    gray_buf = gray
 
                 time.sleep(options['poll_interval'])
 
@@ -136,34 +349,35 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS("Stopping capture"))
         finally:
             frame_source.release()
+            writer.close()
 
-    def _build_rectifier(self, camera):
+    def _build_rectifier(self, camera, use_gpu=True):
         if not camera.is_calibrated or not camera.calibration_dir:
             return None
 
         base = camera.calibration_dir
-        paths = {
-            'camera_matrix': os.path.join(base, 'camera_matrix.npy'),
-            'dist_coeffs': os.path.join(base, 'dist_coeffs.npy'),
-            'new_camera_matrix': os.path.join(base, 'new_camera_matrix.npy'),
-            'homography': os.path.join(base, 'homography.npy'),
-        }
-        missing = [label for label, path in paths.items() if not os.path.exists(path)]
+        calibration = load_calibration(base)
+        homography_path = os.path.join(base, 'homography.npy')
+        missing = []
+        if calibration is None:
+            missing.append('lens calibration')
+        if not os.path.exists(homography_path):
+            missing.append('homography')
         if missing:
             missing_str = ', '.join(missing)
             self.stdout.write(self.style.WARNING(f"Missing calibration files ({missing_str}); skipping rectification."))
             return None
 
-        crop_path = os.path.join(base, 'crop_rect.npy')
-        cropper = FrameCropper(crop_path) if os.path.exists(crop_path) else None
         output_size = self._resolve_output_size(base)
+        crop_rect = calibration['crop_rect']
         return FrameRectifier(
-            camera_matrix_path=paths['camera_matrix'],
-            dist_coeffs_path=paths['dist_coeffs'],
-            new_camera_matrix_path=paths['new_camera_matrix'],
-            homography_path=paths['homography'],
+            camera_matrix=calibration['camera_matrix'],
+            dist_coeffs=calibration['dist_coeffs'],
+            new_camera_matrix=calibration['new_camera_matrix'],
+            homography=np.load(homography_path),
             output_size=output_size,
-            cropper=cropper,
+            cropper=FrameCropper(crop_rect) if crop_rect is not None else None,
+            use_gpu=use_gpu,
         )
 
     def _resolve_output_size(self, calib_dir):
@@ -177,40 +391,71 @@ class Command(BaseCommand):
                 return None
         return None
 
-    def _persist_frame(self, camera, raw_frame, rectified_frame):
-        os.makedirs(CAPTURED_FRAMES_DIR, exist_ok=True)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    def _persist_frame(self, camera, raw_frame, rectified_frame, timestamp, captured_at):
+        ensure_dir(CAPTURED_FRAMES_DIR)
         raw_name = f"sheet{camera.sheet.number}_{camera.side}_{timestamp}.jpg"
         rect_name = f"sheet{camera.sheet.number}_{camera.side}_{timestamp}_rectified.jpg"
 
-        raw_disk_path = os.path.join(CAPTURED_FRAMES_DIR, raw_name)
-        cv2.imwrite(raw_disk_path, raw_frame)
-        cv2.imwrite(os.path.join(CAPTURED_FRAMES_DIR, LATEST_FRAME_ALIAS), raw_frame)
-
-        raw_success, raw_buffer = cv2.imencode('.jpg', raw_frame)
-        if not raw_success:
+        # Each frame is encoded once; the same bytes go to disk, the latest
+        # alias and the model field.
+        raw_bytes = encode_jpeg(raw_frame)
+        if raw_bytes is None:
             self.stderr.write(self.style.ERROR("Failed to encode raw frame; skipping save."))
-            return
+            return None
+        self._write_with_alias(CAPTURED_FRAMES_DIR, raw_name, LATEST_FRAME_ALIAS, raw_bytes)
 
-        rectified_content = None
-        if rectified_frame is not None:
-            rect_dir = os.path.join(CAPTURED_FRAMES_DIR, RECTIFIED_SUBDIR)
-            os.makedirs(rect_dir, exist_ok=True)
-            cv2.imwrite(os.path.join(rect_dir, rect_name), rectified_frame)
-            cv2.imwrite(os.path.join(rect_dir, LATEST_RECTIFIED_ALIAS), rectified_frame)
-
-            rect_success, rect_buffer = cv2.imencode('.jpg', rectified_frame)
-            if rect_success:
-                rectified_content = ContentFile(rect_buffer.tobytes(), name=f"{RECTIFIED_SUBDIR}/{rect_name}")
-            else:
-                self.stderr.write(self.style.WARNING("Rectified frame encode failed; raw frame saved only."))
-
-        frame_kwargs = {
-            'camera': camera,
-            'image': ContentFile(raw_buffer.tobytes(), name=f"raw/{raw_name}")
-        }
-        if rectified_content:
-            frame_kwargs['rectified_image'] = rectified_content
-
-        CapturedFrame.objects.create(**frame_kwargs)
-        self.stdout.write(self.style.SUCCESS(f"Saved frame {raw_name}{' (+rectified)' if rectified_content else ''}"))
+        # The row is inserted later in a batch, so the capture time is set here.
+        record = CapturedFrame(
+            camera=camera,
+            image=self._store_file('image', f"raw/{raw_name}", raw_bytes),
+            timestamp=captured_at,
+        )
+        try:
+            if rectified_frame is not None:
+                rect_bytes = encode_jpeg(rectified_frame)
+                if rect_bytes is not None:
+                    rect_dir = os.path.join(CAPTURED_FRAMES_DIR, RECTIFIED_SUBDIR)
+                    ensure_dir(rect_dir)
+                    self._write_with_alias(rect_dir, rect_name, LATEST_RECTIFIED_ALIAS, rect_bytes)
+                    record.rectified_image = self._store_file(
+                        'rectified_image', f"{RECTIFIED_SUBDIR}/{rect_name}", rect_bytes
+                    )
+                else:
+                    self.stderr.write(self.style.WARNING("Rectified frame encode failed; raw frame saved only."))
+        except Exception:
+            self._discard_files([record])
+            raise
+
+        self.stdout.write(self.style.SUCCESS(f"Saved frame {raw_name}{' (+rectified)' if record.rectified_image else ''}"))
+        return record
+
+    def _store_file(self, field_name, name, data):
+        # Store through the field's storage up front so the row can be
+        # bulk-inserted with a plain path instead of a per-save file upload.
+        field = CapturedFrame._meta.get_field(field_name)
+        return field.storage.save(field.generate_filename(None, name), ContentFile(data))
+
+    def _save_records(self, records):
+        try:
+            with transaction.atomic():
+                CapturedFrame.objects.bulk_create(records, batch_size=32)
+        except Exception:
+            # No row will point at the stored files, so don't leave them behind.
+            self._discard_files(records)
+            raise
+
+    def _discard_files(self, records):
+        for record in records:
+            for field_file in (record.image, record.rectified_image):
+                if not field_file:
+                    continue
+                try:
+                    field_file.delete(save=False)
+                except OSError as exc:
+                    self.stderr.write(self.style.WARNING(f"Could not remove {field_file.name}: {exc}"))
+
+    def _write_with_alias(self, directory, name, alias, data):
+        path = os.path.join(directory, name)
+        with open(path, 'wb') as handle:
+            handle.write(data)
+        update_latest_alias(path, os.path.join(directory, alias), data)
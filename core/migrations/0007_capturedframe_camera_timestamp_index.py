@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-15 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_camera_snapshot_url'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='capturedframe',
+            index=models.Index(fields=['camera', '-timestamp'], name='cf_cam_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-15 11:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_capturedframe_camera_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='capturedframe',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 class Sheet(models.Model):
     number = models.IntegerField(unique=True)
@@ -36,10 +37,13 @@ class CapturedFrame(models.Model):
     camera = models.ForeignKey(Camera, on_delete=models.CASCADE, related_name='frames')
     image = models.ImageField(upload_to='frames/')
     rectified_image = models.ImageField(upload_to='frames/rectified/', blank=True, null=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # A default rather than auto_now_add so batched inserts can record when
+    # the frame was captured instead of when its row was flushed.
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [models.Index(fields=['camera', '-timestamp'], name='cf_cam_ts_idx')]
 
     def __str__(self):
         return f"{self.camera} - {self.timestamp}"
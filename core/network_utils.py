@@ -1,13 +1,12 @@
 from __future__ import annotations
 
-import concurrent.futures
+import asyncio
 import ipaddress
 import socket
+import time
 from dataclasses import dataclass
 from typing import Iterable, List
 
-import requests
-
 
 @dataclass
 class SnapshotHost:
@@ -21,6 +20,11 @@ class SnapshotHost:
 DEFAULT_PORT = 8080
 DEFAULT_PATH = '/last.jpg'
 DEFAULT_TIMEOUT = 1.0
+DEFAULT_CONNECT_TIMEOUT = 0.2
+SCAN_CONCURRENCY = 128
+ADDRESS_CACHE_TTL = 60.0  # Seconds; short enough to follow a DHCP roam
+
+_address_cache: tuple[float, str | None] | None = None
 
 
 def _primary_ipv4_address() -> str | None:
@@ -39,9 +43,17 @@ def _primary_ipv4_address() -> str | None:
             return None
 
 
+def _cached_primary_ipv4_address() -> str | None:
+    global _address_cache
+    now = time.monotonic()
+    if _address_cache is None or now - _address_cache[0] > ADDRESS_CACHE_TTL:
+        _address_cache = (now, _primary_ipv4_address())
+    return _address_cache[1]
+
+
 def detect_ipv4_prefix() -> str | None:
     """Return the leading three octets for the current LAN (e.g., '192.168.1')."""
-    ip = _primary_ipv4_address()
+    ip = _cached_primary_ipv4_address()
     if not ip:
         return None
     parts = ip.split('.')
@@ -57,51 +69,100 @@ def _build_targets(prefix: str) -> Iterable[str]:
         yield str(host)
 
 
-def _probe_snapshot_host(ip: str, port: int, path: str, timeout: float) -> SnapshotHost | None:
-    url = f'http://{ip}:{port}{path}'
+async def _read_response_head(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, ip: str, port: int, path: str
+) -> tuple[int, dict[str, str], bool]:
+    """Send a GET and return (status, headers, has_body) without reading the image."""
     try:
-        response = requests.get(url, timeout=timeout)
-    except requests.RequestException:
-        return None
-    if response.status_code != 200:
+        request = f'GET {path} HTTP/1.1\r\nHost: {ip}:{port}\r\nConnection: close\r\n\r\n'
+        writer.write(request.encode('ascii'))
+        await writer.drain()
+        head = await reader.readuntil(b'\r\n\r\n')
+        first_byte = await reader.read(1)
+    finally:
+        writer.close()
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    status_code = int(status_line.split()[1])
+    headers = {}
+    for line in header_lines:
+        name, sep, value = line.partition(':')
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return status_code, headers, bool(first_byte)
+
+
+async def _probe_snapshot_host(
+    ip: str, port: int, path: str, timeout: float, connect_timeout: float, limit: asyncio.Semaphore
+) -> SnapshotHost | None:
+    url = f'http://{ip}:{port}{path}'
+    async with limit:
+        try:
+            # A LAN host with the port open answers the handshake within a few
+            # milliseconds; most addresses are empty, so give up on them early
+            # and only spend the full timeout on hosts that accepted.
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), connect_timeout)
+            status_code, headers, has_body = await asyncio.wait_for(
+                _read_response_head(reader, writer, ip, port, path), timeout
+            )
+        except (OSError, EOFError, asyncio.LimitOverrunError, asyncio.TimeoutError, ValueError, IndexError):
+            return None
+    if status_code != 200:
         return None
-    content_type = response.headers.get('Content-Type')
+    content_type = headers.get('content-type')
     content_length = None
     try:
-        if 'Content-Length' in response.headers:
-            content_length = int(response.headers['Content-Length'])
+        if 'content-length' in headers:
+            content_length = int(headers['content-length'])
     except (ValueError, TypeError):
         content_length = None
-    if not response.content:
+    if not has_body or content_length == 0:
         return None
     if content_type and 'image' not in content_type.lower():
         return None
     return SnapshotHost(
         ip=ip,
         url=url,
-        status_code=response.status_code,
+        status_code=status_code,
         content_type=content_type,
         content_length=content_length,
     )
 
 
-def scan_snapshot_hosts(
+async def _scan(
+    targets: List[str], port: int, path: str, timeout: float, connect_timeout: float
+) -> List[SnapshotHost | None]:
+    limit = asyncio.Semaphore(SCAN_CONCURRENCY)
+    return await asyncio.gather(
+        *(_probe_snapshot_host(ip, port, path, timeout, connect_timeout, limit) for ip in targets)
+    )
+
+
+async def ascan_snapshot_hosts(
     prefix: str,
     port: int = DEFAULT_PORT,
     path: str = DEFAULT_PATH,
     timeout: float = DEFAULT_TIMEOUT,
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
 ) -> List[SnapshotHost]:
-    """Probe the /24 for HTTP snapshot endpoints."""
+    """Probe the /24 for HTTP snapshot endpoints.
+
+    Every host is probed concurrently on the running event loop. Addresses
+    that do not accept a TCP connection within ``connect_timeout`` are
+    dropped; the rest get ``timeout`` to answer a GET, of which only the
+    headers and first body byte are read.
+    """
     targets = list(_build_targets(prefix))
-    hosts: List[SnapshotHost] = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=32) as executor:
-        future_to_ip = {
-            executor.submit(_probe_snapshot_host, ip, port, path, timeout): ip
-            for ip in targets
-        }
-        for future in concurrent.futures.as_completed(future_to_ip):
-            result = future.result()
-            if result:
-                hosts.append(result)
+    hosts = [host for host in await _scan(targets, port, path, timeout, connect_timeout) if host]
     hosts.sort(key=lambda host: host.ip)
     return hosts
+
+
+def scan_snapshot_hosts(
+    prefix: str,
+    port: int = DEFAULT_PORT,
+    path: str = DEFAULT_PATH,
+    timeout: float = DEFAULT_TIMEOUT,
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+) -> List[SnapshotHost]:
+    """Blocking wrapper around ``ascan_snapshot_hosts`` for synchronous callers."""
+    return asyncio.run(ascan_snapshot_hosts(prefix, port, path, timeout, connect_timeout))
@@ -4,7 +4,14 @@ import os
 import signal
 import subprocess
 import sys
-from typing import Sequence
+from typing import Iterable, Sequence, Set
+
+try:
+    import psutil  # type: ignore[import]
+except ImportError:  # psutil is optional; without it termination is fire-and-forget.
+    psutil = None
+
+TERMINATE_TIMEOUT = 2.0  # Seconds to wait for a graceful exit before killing
 
 
 def get_background_python_executable() -> str:
@@ -41,6 +48,8 @@ def launch_detached_process(cmd: Sequence[str], cwd: str | None = None) -> subpr
 
 def terminate_process(pid: int) -> bool:
     """Attempt to terminate a background process regardless of platform."""
+    if psutil is not None:
+        return pid in terminate_processes([pid])
     try:
         if os.name == 'nt':
             completed = subprocess.run(
@@ -61,3 +70,38 @@ def terminate_process(pid: int) -> bool:
         return True
     except (ProcessLookupError, PermissionError, OSError, subprocess.SubprocessError):
         return False
+
+
+def terminate_processes(pids: Iterable[int], timeout: float = TERMINATE_TIMEOUT) -> Set[int]:
+    """Terminate several background processes and return the PIDs that exited.
+
+    With psutil every process (and its children) is signalled first and all
+    of them are then awaited together, so stopping N captures costs one
+    ``timeout`` rather than N. Anything still alive afterwards is killed.
+    Without psutil each PID goes through ``terminate_process`` and a
+    delivered signal counts as stopped.
+    """
+    if psutil is None:
+        return {pid for pid in pids if terminate_process(pid)}
+    owners = {}
+    for pid in pids:
+        try:
+            proc = psutil.Process(pid)
+            family = [proc, *proc.children(recursive=True)]
+        except psutil.Error:
+            continue
+        for member in family:
+            try:
+                member.terminate()
+            except psutil.Error:
+                continue
+            owners[member] = pid
+    _, alive = psutil.wait_procs(list(owners), timeout=timeout)
+    for proc in alive:
+        try:
+            proc.kill()
+        except psutil.Error:
+            pass
+    _, still_alive = psutil.wait_procs(alive, timeout=timeout)
+    failed = {owners[proc] for proc in still_alive}
+    return {pid for pid in owners.values() if pid not in failed}
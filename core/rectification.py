@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import warnings
+from typing import Optional, Tuple
+
+import cv2  # type: ignore[import]
+import numpy as np
+
+from .jit import HAVE_NUMBA, njit, prange
+
+# k1, k2, p1, p2, k3, k4, k5, k6: the rational model the JIT kernel evaluates.
+# Longer vectors (thin prism, tilt) go through cv2.projectPoints instead.
+_JIT_DIST_TERMS = 8
+
+
+def cuda_available() -> bool:
+    """Return True when OpenCV was built with CUDA and a device is present."""
+    cuda = getattr(cv2, 'cuda', None)
+    if cuda is None:
+        return False
+    try:
+        return cuda.getCudaEnabledDeviceCount() > 0
+    except cv2.error:
+        return False
+
+
+def opencl_available() -> bool:
+    """Return True when OpenCV's transparent API can dispatch UMat work to OpenCL."""
+    ocl = getattr(cv2, 'ocl', None)
+    if ocl is None:
+        return False
+    try:
+        if not ocl.haveOpenCL():
+            return False
+        ocl.setUseOpenCL(True)
+        return ocl.useOpenCL()
+    except cv2.error:
+        return False
+
+
+def translation(dx: float, dy: float) -> np.ndarray:
+    """Return a 3x3 homogeneous translation matrix."""
+    return np.array([[1.0, 0.0, dx], [0.0, 1.0, dy], [0.0, 0.0, 1.0]], dtype=np.float64)
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _rectify_maps_jit(inverse_warp, new_k_inv, camera_matrix, dist, valid, out_w, out_h):
+    map_x = np.empty((out_h, out_w), dtype=np.float32)
+    map_y = np.empty((out_h, out_w), dtype=np.float32)
+    fx = camera_matrix[0, 0]
+    fy = camera_matrix[1, 1]
+    cx = camera_matrix[0, 2]
+    cy = camera_matrix[1, 2]
+    k1, k2, p1, p2, k3 = dist[0], dist[1], dist[2], dist[3], dist[4]
+    k4, k5, k6 = dist[5], dist[6], dist[7]
+    for i in prange(out_h):
+        for j in range(out_w):
+            # Output pixel -> undistorted pixel.
+            w = inverse_warp[2, 0] * j + inverse_warp[2, 1] * i + inverse_warp[2, 2]
+            if w == 0.0:
+                map_x[i, j] = -1.0
+                map_y[i, j] = -1.0
+                continue
+            u = (inverse_warp[0, 0] * j + inverse_warp[0, 1] * i + inverse_warp[0, 2]) / w
+            v = (inverse_warp[1, 0] * j + inverse_warp[1, 1] * i + inverse_warp[1, 2]) / w
+            if valid[2] > 0 and (
+                u < valid[0] or u > valid[0] + valid[2] - 1 or v < valid[1] or v > valid[1] + valid[3] - 1
+            ):
+                map_x[i, j] = -1.0
+                map_y[i, j] = -1.0
+                continue
+            # Undistorted pixel -> normalised camera ray.
+            z = new_k_inv[2, 0] * u + new_k_inv[2, 1] * v + new_k_inv[2, 2]
+            x = (new_k_inv[0, 0] * u + new_k_inv[0, 1] * v + new_k_inv[0, 2]) / z
+            y = (new_k_inv[1, 0] * u + new_k_inv[1, 1] * v + new_k_inv[1, 2]) / z
+            # Forward Brown-Conrady model, as in cv2.projectPoints.
+            r2 = x * x + y * y
+            r4 = r2 * r2
+            r6 = r4 * r2
+            radial = (1.0 + k1 * r2 + k2 * r4 + k3 * r6) / (1.0 + k4 * r2 + k5 * r4 + k6 * r6)
+            xd = x * radial + 2.0 * p1 * x * y + p2 * (r2 + 2.0 * x * x)
+            yd = y * radial + p1 * (r2 + 2.0 * y * y) + 2.0 * p2 * x * y
+            map_x[i, j] = fx * xd + cx
+            map_y[i, j] = fy * yd + cy
+    return map_x, map_y
+
+
+def build_rectify_maps(
+    camera_matrix: np.ndarray,
+    dist_coeffs: np.ndarray,
+    new_camera_matrix: np.ndarray,
+    inverse_warp: np.ndarray,
+    output_size: Tuple[int, int],
+    valid_rect: Optional[Tuple[int, int, int, int]] = None,
+    map_type: int = cv2.CV_16SC2,
+):
+    """Compose undistort + crop + perspective warp into a single remap table.
+
+    ``inverse_warp`` maps output pixels back into the undistorted image (for a
+    plain warp this is ``inv(H)``; crops are folded in as translations).  Each
+    output pixel is then normalised with the new camera matrix and pushed
+    through the forward distortion model so it lands on the raw source pixel,
+    letting one ``cv2.remap`` replace ``undistort`` followed by ``warpPerspective``.
+
+    ``valid_rect`` (x, y, w, h in undistorted pixels) blanks every output pixel
+    that would have fallen outside a crop applied before the warp.
+
+    With Numba installed the whole table is built by one parallel kernel;
+    otherwise OpenCV's point transforms do it in vectorised passes.
+    """
+    out_w, out_h = int(output_size[0]), int(output_size[1])
+    coeffs = np.asarray(dist_coeffs, dtype=np.float64).ravel()
+    if HAVE_NUMBA and coeffs.size <= _JIT_DIST_TERMS:
+        dist = np.zeros(_JIT_DIST_TERMS, dtype=np.float64)
+        dist[: coeffs.size] = coeffs
+        valid = np.asarray(valid_rect if valid_rect is not None else (0, 0, 0, 0), dtype=np.float64)
+        map_x, map_y = _rectify_maps_jit(
+            np.asarray(inverse_warp, dtype=np.float64),
+            np.linalg.inv(np.asarray(new_camera_matrix, dtype=np.float64)),
+            np.asarray(camera_matrix, dtype=np.float64),
+            dist,
+            valid,
+            out_w,
+            out_h,
+        )
+        if map_type == cv2.CV_32FC1:
+            return map_x, map_y
+        return cv2.convertMaps(map_x, map_y, map_type)
+
+    xs, ys = np.meshgrid(np.arange(out_w, dtype=np.float64), np.arange(out_h, dtype=np.float64))
+    grid = np.stack([xs, ys], axis=-1).reshape(-1, 1, 2)
+
+    undistorted = cv2.perspectiveTransform(grid, np.asarray(inverse_warp, dtype=np.float64))
+    normalized = cv2.perspectiveTransform(
+        undistorted, np.linalg.inv(np.asarray(new_camera_matrix, dtype=np.float64))
+    ).reshape(-1, 2)
+    object_points = np.column_stack([normalized, np.ones(len(normalized))])
+
+    zero = np.zeros(3, dtype=np.float64)
+    source, _ = cv2.projectPoints(
+        object_points,
+        zero,
+        zero,
+        np.asarray(camera_matrix, dtype=np.float64),
+        np.asarray(dist_coeffs, dtype=np.float64),
+    )
+    source = source.reshape(out_h, out_w, 2).astype(np.float32)
+    if valid_rect is not None:
+        x, y, w, h = valid_rect
+        undistorted = undistorted.reshape(out_h, out_w, 2)
+        outside = (
+            (undistorted[..., 0] < x)
+            | (undistorted[..., 0] > x + w - 1)
+            | (undistorted[..., 1] < y)
+            | (undistorted[..., 1] > y + h - 1)
+        )
+        source[outside] = -1.0
+    map_x = np.ascontiguousarray(source[..., 0])
+    map_y = np.ascontiguousarray(source[..., 1])
+    if map_type == cv2.CV_32FC1:
+        return map_x, map_y
+    return cv2.convertMaps(map_x, map_y, map_type)
+
+
+def cached_rectify_maps(
+    cache_dir: str,
+    camera_matrix: np.ndarray,
+    dist_coeffs: np.ndarray,
+    new_camera_matrix: np.ndarray,
+    inverse_warp: np.ndarray,
+    output_size: Tuple[int, int],
+    valid_rect: Optional[Tuple[int, int, int, int]] = None,
+    map_type: int = cv2.CV_16SC2,
+):
+    """``build_rectify_maps`` backed by an ``.npz`` cache in ``cache_dir``.
+
+    The file name is a hash of every input, so a recalibration or a new output
+    size simply misses and writes a fresh entry.
+    """
+    parts = [
+        np.asarray(camera_matrix, dtype=np.float64).ravel(),
+        np.asarray(dist_coeffs, dtype=np.float64).ravel(),
+        np.asarray(new_camera_matrix, dtype=np.float64).ravel(),
+        np.asarray(inverse_warp, dtype=np.float64).ravel(),
+        np.asarray(output_size, dtype=np.float64),
+        np.asarray(valid_rect if valid_rect is not None else (), dtype=np.float64),
+        np.asarray([map_type], dtype=np.float64),
+    ]
+    key = hashlib.sha1(np.concatenate(parts).tobytes()).hexdigest()[:16]
+    path = os.path.join(cache_dir, f"remap_{key}.npz")
+
+    if os.path.exists(path):
+        try:
+            with np.load(path) as cached:
+                return cached["map1"], cached["map2"]
+        except (OSError, KeyError, ValueError):
+            pass  # Corrupt or partial entry; rebuild below.
+
+    map1, map2 = build_rectify_maps(
+        camera_matrix,
+        dist_coeffs,
+        new_camera_matrix,
+        inverse_warp,
+        output_size,
+        valid_rect=valid_rect,
+        map_type=map_type,
+    )
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, map1=map1, map2=map2)
+        os.replace(tmp_path, path)
+    except OSError as exc:
+        warnings.warn(f"could not cache remap tables in {cache_dir}: {exc}", RuntimeWarning, stacklevel=2)
+    return map1, map2
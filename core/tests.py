@@ -1,3 +1,106 @@
-from django.test import TestCase
+import datetime
+import os
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from core.calibration_files import load_calibration
+from core.calibration_service import create_calibration_session
+from core.capture_utils import _seed_frame
+from core.management.commands.capture import Command, FrameWriter
+from core.models import CalibrationSession, Camera, CapturedFrame, Sheet
+
+
+class FrameWriterTests(SimpleTestCase):
+    def test_non_oserror_failures_do_not_stop_the_writer(self):
+        errors = []
+        flushed = []
+        done = threading.Event()
+
+        def persist(value):
+            if value == 'bad':
+                raise ValueError('encode failed')
+            return value
+
+        def flush(records):
+            if 'flaky' in records:
+                raise RuntimeError('flush failed')
+            flushed.extend(records)
+            done.set()
+
+        writer = FrameWriter(persist, flush, errors.append, batch_size=1)
+        try:
+            writer.submit('bad')
+            writer.submit('flaky')
+            writer.submit('good')
+            self.assertTrue(done.wait(5))
+        finally:
+            writer.close()
+
+        self.assertEqual(flushed, ['good'])
+        self.assertEqual([type(exc) for exc in errors], [ValueError, RuntimeError])
+
+
+class SaveRecordsTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.camera = Camera.objects.create(sheet=Sheet.objects.create(number=1), side='odd')
+        self.command = Command()
+
+    def _record(self, captured_at):
+        image = self.command._store_file('image', 'raw/frame.jpg', b'jpeg')
+        return CapturedFrame(camera=self.camera, image=image, timestamp=captured_at)
+
+    def test_rows_keep_the_capture_time(self):
+        captured_at = timezone.now() - datetime.timedelta(seconds=30)
+        self.command._save_records([self._record(captured_at)])
+        self.assertEqual(CapturedFrame.objects.get().timestamp, captured_at)
+
+    def test_failed_flush_removes_stored_files(self):
+        record = self._record(timezone.now())
+        storage, name = record.image.storage, record.image.name
+        self.assertTrue(storage.exists(name))
+        with mock.patch.object(CapturedFrame.objects, 'bulk_create', side_effect=DatabaseError('locked')):
+            with self.assertRaises(DatabaseError):
+                self.command._save_records([record])
+        self.assertFalse(storage.exists(name))
+
+
+class LoadCalibrationTests(SimpleTestCase):
+    def test_legacy_directory_without_crop_rect(self):
+        with tempfile.TemporaryDirectory() as directory:
+            np.save(os.path.join(directory, 'camera_matrix.npy'), np.eye(3))
+            np.save(os.path.join(directory, 'dist_coeffs.npy'), np.zeros(5))
+            np.save(os.path.join(directory, 'new_camera_matrix.npy'), np.eye(3))
+            calibration = load_calibration(directory)
+        self.assertIsNotNone(calibration)
+        self.assertIsNone(calibration['crop_rect'])
+
+
+class SeedFrameTests(TestCase):
+    def test_any_failure_is_recorded(self):
+        camera = Camera.objects.create(sheet=Sheet.objects.create(number=1), side='odd', device_index=0)
+        self.addCleanup(cache.clear)
+        cache.add('core:seeding:test', True)
+        with mock.patch('core.capture_utils.capture_single_frame', side_effect=OSError('disk full')):
+            with mock.patch('core.capture_utils.connection'):
+                _seed_frame(camera.pk, 'core:seeding:test')
+        self.assertEqual(cache.get(f'core:seed_error:{camera.pk}'), 'disk full')
+        self.assertIsNone(cache.get('core:seeding:test'))
+
+
+class CreateCalibrationSessionTests(TestCase):
+    def test_missing_source_leaves_no_session(self):
+        camera = Camera.objects.create(sheet=Sheet.objects.create(number=1), side='odd')
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(FileNotFoundError):
+                create_calibration_session(camera, os.path.join(directory, 'gone.jpg'), lines=[[(0, 0), (10, 0)]])
+        self.assertFalse(CalibrationSession.objects.exists())
@@ -3,9 +3,43 @@ import os
 import re
 import shutil
 import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
 
+try:
+    import pythoncom  # type: ignore[import]
+    import wmi  # type: ignore[import]
+except ImportError:
+    wmi = None
+
+_VIDEO_NODE_RE = re.compile(r'video(\d+)')
+_VIDEO_DEV_RE = re.compile(r'/dev/video(\d+)')
+
+
+def ensure_dir(path):
+    """Create ``path`` if it is missing and return it.
+
+    Deliberately not memoised: an output directory removed while the server
+    or capture command runs is simply recreated on the next call.
+    """
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def dir_contains(directory, names):
+    """Return the subset of ``names`` present in ``directory`` from one listing.
+
+    A missing or unreadable directory contains nothing.
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return set(names) & {entry.name for entry in entries}
+    except OSError:
+        return set()
+
 
 def _preferred_capture_api():
     if os.name == 'nt' and hasattr(cv2, 'CAP_DSHOW'):
@@ -25,23 +59,98 @@ def open_camera(index):
     return cv2.VideoCapture(index)
 
 
+def configure_capture(cap, fourcc=None, width=None, height=None, fps=None):
+    """Request a pixel format, resolution and frame rate from the driver.
+
+    Asking for MJPG lets USB/HDMI grabbers send compressed frames instead of
+    raw YUY2 at full resolution. Drivers may ignore any of these, so falsy
+    values are skipped and the negotiated settings are returned.
+    """
+    if fourcc:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc[:4].ljust(4)))
+    if width:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    if height:
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if fps:
+        cap.set(cv2.CAP_PROP_FPS, fps)
+
+    code = int(cap.get(cv2.CAP_PROP_FOURCC))
+    negotiated = ''.join(chr((code >> (8 * i)) & 0xFF) for i in range(4)) if code > 0 else ''
+    return (
+        negotiated,
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        cap.get(cv2.CAP_PROP_FPS),
+    )
+
+
 def list_available_cameras(max_range=10):
     """Return indices for cameras that successfully deliver a frame."""
-    available = []
-    for i in range(max_range):
-        cap = open_camera(i)
-        if cap.isOpened():
-            ret, _ = cap.read()
-            if ret:
-                available.append(i)
+    candidates = _candidate_indices(max_range)
+    if not candidates:
+        return []
+    # Opening a device mostly waits on the driver, so probe them side by side.
+    with ThreadPoolExecutor(max_workers=len(candidates)) as pool:
+        results = pool.map(_probe_camera, candidates)
+    return [index for index, ok in zip(candidates, results) if ok]
+
+
+def _probe_camera(index):
+    cap = open_camera(index)
+    try:
+        if not cap.isOpened():
+            return False
+        # grab() proves the device delivers frames without decoding one.
+        return cap.grab()
+    finally:
         cap.release()
-    return available
+
+
+def _candidate_indices(max_range):
+    """Indices worth probing: existing /dev/videoN nodes on Linux, else all."""
+    if not sys.platform.startswith('linux'):
+        return list(range(max_range))
+    try:
+        names = os.listdir('/dev')
+    except OSError:
+        return list(range(max_range))
+    indices = set()
+    for name in names:
+        match = _VIDEO_NODE_RE.fullmatch(name)
+        if match and int(match.group(1)) < max_range:
+            indices.add(int(match.group(1)))
+    return sorted(indices)
+
+
+_wmi_local = threading.local()
+
+
+def _wmi_camera_names():
+    """Camera names from WMI in-process, or None when WMI is unavailable.
+
+    COM objects belong to the thread that created them, so each thread
+    initialises COM and keeps its own client.
+    """
+    if wmi is None:
+        return None
+    try:
+        client = getattr(_wmi_local, 'client', None)
+        if client is None:
+            pythoncom.CoInitialize()
+            client = _wmi_local.client = wmi.WMI()
+        return [device.Name for device in client.Win32_PnPEntity(PNPClass='Camera') if device.Name]
+    except (pythoncom.com_error, wmi.x_wmi):
+        return None
 
 
 def _windows_camera_friendly_names():
-    """Best-effort fetch of Windows camera device names via PowerShell."""
+    """Best-effort fetch of Windows camera device names via WMI or PowerShell."""
     if os.name != 'nt':
         return []
+    names = _wmi_camera_names()
+    if names is not None:
+        return names
     script = (
         "Get-PnpDevice -Class Camera | Select-Object -ExpandProperty FriendlyName | ConvertTo-Json -Compress"
     )
@@ -85,7 +194,7 @@ def _linux_camera_friendly_names():
         if not line.startswith('\t'):
             current_name = line.strip().rstrip(':')
             continue
-        match = re.search(r'/dev/video(\d+)', line)
+        match = _VIDEO_DEV_RE.search(line)
         if match and current_name:
             mapping[int(match.group(1))] = current_name
     return mapping
@@ -3,16 +3,20 @@ import shutil
 import time
 
 from django.conf import settings
-from django.db.models import Prefetch
+from django.db.models import OuterRef, Subquery
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.http import JsonResponse
+from django.views.decorators.cache import cache_page
 from django.views.decorators.http import require_POST
 
+from core.calibration_files import CANDIDATE_FILES, calibration_files
 from core.calibration_pipeline import CalibrationComputationError
 from core.calibration_service import create_calibration_session
-from core.capture_utils import capture_single_frame
-from core.network_utils import detect_ipv4_prefix, scan_snapshot_hosts
+from core.capture_utils import capture_single_frame, seed_frame_in_background
+from core.image_io import update_latest_alias
+from core.network_utils import ascan_snapshot_hosts, detect_ipv4_prefix
+from core.utils import dir_contains
 from .platform_utils import (
     get_background_python_executable,
     launch_detached_process,
@@ -29,73 +33,81 @@ def _frame_exists(frame):
     except (ValueError, OSError):
         return False
 
+def _in_bulk(queryset, ids):
+    """Return ``queryset.in_bulk`` for the non-null ``ids``, skipping the query when empty."""
+    ids = [pk for pk in ids if pk is not None]
+    return queryset.in_bulk(ids) if ids else {}
+
+# The dashboard only lists sheets, which change through the admin; a short
+# page cache is safe because it renders no forms or flashed messages.
+@cache_page(30)
 def dashboard(request):
     sheets = Sheet.objects.all().order_by('number')
     return render(request, 'core/dashboard.html', {'sheets': sheets})
 
-def _ensure_frame_available(camera, frame=None):
-    if frame and frame.image and frame.image.name:
-        try:
-            if os.path.exists(frame.image.path):
-                return frame
-        except (ValueError, OSError):
-            pass
-        frame.delete()
-    try:
-        return capture_single_frame(camera)
-    except RuntimeError as exc:
-        messages.warning(
-            None,
-            f"{camera.get_side_display()} camera: {exc}",
-        )
-        return None
-
 
 def sheet_detail(request, sheet_id):
     sheet = get_object_or_404(Sheet, number=sheet_id)
 
-    frame_prefetch = Prefetch(
-        'frames',
-        queryset=CapturedFrame.objects.order_by('-timestamp'),
-        to_attr='prefetched_frames'
+    # Each card shows only the newest frame, artifact and pending session. The
+    # camera query picks their ids with correlated subqueries, then one
+    # in_bulk() per model loads just those rows and the rendered columns.
+    cameras = list(
+        Camera.objects.filter(sheet=sheet).annotate(
+            last_frame_id=Subquery(
+                CapturedFrame.objects.filter(camera=OuterRef('pk'))
+                .order_by('-timestamp')
+                .values('id')[:1]
+            ),
+            last_artifact_id=Subquery(
+                CalibrationArtifact.objects.filter(camera=OuterRef('pk'))
+                .order_by('-created_at')
+                .values('id')[:1]
+            ),
+            pending_session_id=Subquery(
+                CalibrationSession.objects.filter(
+                    camera=OuterRef('pk'), status=CalibrationSession.Status.PENDING
+                )
+                .order_by('-created_at')
+                .values('id')[:1]
+            ),
+        )
+    )
+    frames = _in_bulk(
+        CapturedFrame.objects.only('id', 'camera', 'image', 'rectified_image', 'timestamp'),
+        [cam.last_frame_id for cam in cameras],
     )
-    artifact_prefetch = Prefetch(
-        'calibration_artifacts',
-        queryset=CalibrationArtifact.objects.order_by('-created_at'),
-        to_attr='prefetched_artifacts'
+    artifacts = _in_bulk(
+        CalibrationArtifact.objects.only(
+            'id', 'camera', 'artifact_type', 'artifact_file', 'notes', 'created_at'
+        ),
+        [cam.last_artifact_id for cam in cameras],
     )
-    session_prefetch = Prefetch(
-        'calibration_sessions',
-        queryset=CalibrationSession.objects.order_by('-created_at'),
-        to_attr='prefetched_sessions'
+    sessions = _in_bulk(
+        CalibrationSession.objects.only(
+            'id', 'camera', 'status', 'source_image', 'rectified_preview',
+            'fit_error', 'crop_rect', 'metadata', 'created_at',
+        ),
+        [cam.pending_session_id for cam in cameras],
     )
 
     camera_cards = []
-    cameras = Camera.objects.filter(sheet=sheet).prefetch_related(
-        frame_prefetch,
-        artifact_prefetch,
-        session_prefetch,
-    )
     for cam in cameras:
-        last_frame = cam.prefetched_frames[0] if cam.prefetched_frames else None
+        last_frame = frames.get(cam.last_frame_id)
         if last_frame and not _frame_exists(last_frame):
             last_frame.delete()
             last_frame = None
+        capturing = False
         if last_frame is None:
-            try:
-                last_frame = capture_single_frame(cam)
-                messages.info(
-                    request,
-                    f"Captured a still for {cam.get_side_display()} camera to seed calibration.",
-                )
-            except RuntimeError as exc:
-                messages.warning(request, f"{cam.get_side_display()} camera: {exc}")
-        last_artifact = cam.prefetched_artifacts[0] if cam.prefetched_artifacts else None
-        pending_session = None
-        for session in getattr(cam, 'prefetched_sessions', []):
-            if session.status == CalibrationSession.Status.PENDING:
-                pending_session = session
-                break
+            # Grabbing a still can block for seconds on hardware, so it runs
+            # in the background and the page reloads until the frame exists.
+            error = seed_frame_in_background(cam)
+            if error:
+                messages.warning(request, f"{cam.get_side_display()} camera: {error}")
+            else:
+                capturing = True
+        last_artifact = artifacts.get(cam.last_artifact_id)
+        pending_session = sessions.get(cam.pending_session_id)
         pending_meta = None
         if pending_session:
             crop = pending_session.crop_rect or {}
@@ -115,6 +127,7 @@ def sheet_detail(request, sheet_id):
         camera_cards.append({
             'camera': cam,
             'last_frame': last_frame,
+            'capturing': capturing,
             'last_artifact': last_artifact,
             'pending_session': pending_session,
             'pending_meta': pending_meta,
@@ -132,14 +145,16 @@ def update_camera(request):
         snapshot_url = (request.POST.get('snapshot_url') or '').strip()
         
         try:
-            camera = Camera.objects.get(sheet__number=sheet_num, side=side)
-            update_fields = []
-            camera.device_index = None
-            camera.snapshot_url = snapshot_url
-            update_fields.extend(['device_index', 'snapshot_url'])
-            camera.save(update_fields=update_fields)
-
-            if not camera.snapshot_url:
+            # One UPDATE instead of a fetch followed by a save.
+            updated = Camera.objects.filter(sheet__number=sheet_num, side=side).update(
+                device_index=None,
+                snapshot_url=snapshot_url,
+            )
+            if not updated:
+                messages.error(request, f"No {side} camera found for Sheet {sheet_num}.")
+                return redirect('sheet_detail', sheet_id=sheet_num)
+
+            if not snapshot_url:
                 messages.warning(request, f"{side.capitalize()} camera has no snapshot URL configured.")
             else:
                 messages.success(request, f"Updated {side} camera snapshot URL.")
@@ -156,14 +171,15 @@ def start_calibration(request, sheet_id, side):
         messages.error(request, "Invalid camera side supplied for calibration.")
         return redirect('sheet_detail', sheet_id=sheet_id)
 
-    camera = get_object_or_404(Camera, sheet__number=sheet_id, side=side)
+    camera = get_object_or_404(Camera.objects.select_related('sheet'), sheet__number=sheet_id, side=side)
     frame = camera.frames.order_by('-timestamp').first()
+    image = None
     if frame and not _frame_exists(frame):
         frame.delete()
         frame = None
     if not frame:
         try:
-            frame = capture_single_frame(camera)
+            frame, image = capture_single_frame(camera, return_image=True)
             messages.info(request, "Captured a fresh still from the camera for calibration.")
         except RuntimeError as exc:
             messages.error(request, str(exc))
@@ -175,7 +191,11 @@ def start_calibration(request, sheet_id, side):
         return redirect('sheet_detail', sheet_id=sheet_id)
 
     try:
-        session = create_calibration_session(camera, image_path)
+        session = create_calibration_session(camera, image_path, frame=image)
+    except FileNotFoundError:
+        # Deleted after the check above; the session row is not created.
+        messages.error(request, "Calibration frame is missing from disk; capture a new still and retry.")
+        return redirect('sheet_detail', sheet_id=sheet_id)
     except CalibrationComputationError as exc:
         messages.error(request, str(exc))
         return redirect('sheet_detail', sheet_id=sheet_id)
@@ -192,7 +212,7 @@ def accept_calibration(request):
         session_id = request.POST.get('session_id')
         next_url = request.POST.get('next', 'dashboard')
         session = get_object_or_404(
-            CalibrationSession,
+            CalibrationSession.objects.select_related('camera__sheet'),
             id=session_id,
             status=CalibrationSession.Status.PENDING,
         )
@@ -202,15 +222,12 @@ def accept_calibration(request):
             return redirect(next_url)
 
         artifact_dir = os.path.join(settings.BASE_DIR, session.artifact_dir)
-        required_files = [
-            'camera_matrix.npy',
-            'dist_coeffs.npy',
-            'new_camera_matrix.npy',
-            'crop_rect.npy',
-        ]
-        missing = [name for name in required_files if not os.path.exists(os.path.join(artifact_dir, name))]
-        if missing:
-            messages.error(request, f"Missing staged artifacts: {', '.join(missing)}")
+        optional_previews = ['undistorted_preview.jpg', 'rectified_preview.jpg']
+        # One directory listing answers every existence check below.
+        present = dir_contains(artifact_dir, [*CANDIDATE_FILES, *optional_previews])
+        required_files = calibration_files(artifact_dir, present)
+        if required_files is None:
+            messages.error(request, "Missing staged calibration artifacts for this session.")
             return redirect(next_url)
 
         camera = session.camera
@@ -218,13 +235,12 @@ def accept_calibration(request):
         absolute_final = os.path.join(settings.BASE_DIR, relative_final)
         os.makedirs(absolute_final, exist_ok=True)
 
+        # Staged sessions are never rewritten, so hard-linking them is safe.
         for filename in required_files:
-            shutil.copy2(os.path.join(artifact_dir, filename), os.path.join(absolute_final, filename))
-        optional_previews = ['undistorted_preview.jpg', 'rectified_preview.jpg']
+            update_latest_alias(os.path.join(artifact_dir, filename), os.path.join(absolute_final, filename))
         for preview in optional_previews:
-            source_path = os.path.join(artifact_dir, preview)
-            if os.path.exists(source_path):
-                shutil.copy2(source_path, os.path.join(absolute_final, preview))
+            if preview in present:
+                update_latest_alias(os.path.join(artifact_dir, preview), os.path.join(absolute_final, preview))
 
         camera.calibration_dir = relative_final
         camera.is_calibrated = True
@@ -299,8 +315,7 @@ def trigger_motion_capture(request):
 
         try:
             proc = launch_detached_process(cmd, cwd=settings.BASE_DIR)
-            camera.motion_capture_pid = proc.pid
-            camera.save(update_fields=['motion_capture_pid'])
+            Camera.objects.filter(pk=camera.pk).update(motion_capture_pid=proc.pid)
             messages.success(request, f"Started motion capture for Sheet {sheet_num} {side}. Use Stop to end it.")
         except Exception as exc:
             messages.error(request, f"Failed to launch motion capture: {exc}")
@@ -327,22 +342,22 @@ def stop_motion_capture(request):
             return redirect(next_url)
 
         if terminate_process(pid):
-            camera.motion_capture_pid = None
-            camera.save(update_fields=['motion_capture_pid'])
             messages.success(request, f"Stopped motion capture for Sheet {sheet_num} {side}.")
         else:
             messages.warning(request, "Could not confirm process termination; it may have already exited.")
-            camera.motion_capture_pid = None
-            camera.save(update_fields=['motion_capture_pid'])
+        # Only clear the PID we stopped, in case another request started a new run.
+        Camera.objects.filter(pk=camera.pk, motion_capture_pid=pid).update(motion_capture_pid=None)
         return redirect(next_url)
     return redirect('dashboard')
 
 
-def scan_snapshot_cameras(request):
+async def scan_snapshot_cameras(request):
+    # Async so the /24 probe runs on the server's event loop under ASGI
+    # instead of holding a worker thread for the whole scan.
     prefix = detect_ipv4_prefix()
     if not prefix:
         return JsonResponse({'error': 'Unable to determine local IPv4 network.'}, status=503)
-    hosts = scan_snapshot_hosts(prefix)
+    hosts = await ascan_snapshot_hosts(prefix)
     payload = [
         {
             'ip': host.ip,
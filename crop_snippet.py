@@ -2,10 +2,22 @@ import numpy as np
 import cv2
 
 # Load once at startup
+K    = np.load("camera_matrix.npy")
+dist = np.load("dist_coeffs.npy")
+newK = np.load("new_camera_matrix.npy")
 crop_x, crop_y, crop_w, crop_h = np.load("crop_rect.npy")
 
-# inside your capture loop, after undistortion:
-# undist = cv2.undistort(frame, K, dist, None, newK)
+# Build the undistortion map for the crop only: shifting newK's principal
+# point by the crop origin makes remap produce the ROI directly, so pixels
+# outside it are never computed. CV_16SC2 keeps the table half the size of
+# float maps.
+roiK = newK.astype(np.float64).copy()
+roiK[0, 2] -= crop_x
+roiK[1, 2] -= crop_y
+map1, map2 = cv2.initUndistortRectifyMap(
+    K, dist, None, roiK, (int(crop_w), int(crop_h)), cv2.CV_16SC2
+)
 
-roi = undist[crop_y:crop_y+crop_h, crop_x:crop_x+crop_w]
+# inside your capture loop, instead of cv2.undistort + slicing:
+roi = cv2.remap(frame, map1, map2, cv2.INTER_LINEAR)
 # now use `roi` (display, save, feed to homography, etc.)
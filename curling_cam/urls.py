@@ -13,7 +13,6 @@ urlpatterns = [
     path('calibration/accept/', views.accept_calibration, name='accept_calibration'),
     path('calibration/reject/', views.reject_calibration, name='reject_calibration'),
     path('motion-capture/', views.trigger_motion_capture, name='motion_capture'),
-    path('capture/', views.trigger_motion_capture, name='capture'),
     path('stop-motion-capture/', views.stop_motion_capture, name='stop_motion_capture'),
     path('api/scan-cameras/', views.scan_snapshot_cameras, name='scan_snapshot_cameras'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
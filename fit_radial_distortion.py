@@ -3,6 +3,13 @@ import cv2
 import json
 import numpy as np
 
+from core.jit import HAVE_NUMBA, njit
+
+try:
+    from scipy.optimize import least_squares
+except ImportError:  # SciPy is optional; without it the grid result is used as-is.
+    least_squares = None
+
 JPEG_DIR = "jpeg"
 
 IMAGE_PATH = os.path.join(JPEG_DIR, "sample_sheet.jpg")
@@ -17,7 +24,13 @@ with open(LINES_JSON, "r") as f:
     data = json.load(f)
 
 lines = data["lines"]  # list of list of [x, y]
-lines = [np.array(l, dtype=np.float32) for l in lines]
+lines = [np.array(l, dtype=np.float32) for l in lines if len(l)]
+
+# All lines live in one flat buffer so each candidate needs a single
+# undistortPoints call; starts/counts delimit the lines for np.add.reduceat.
+points = np.concatenate(lines).astype(np.float64)
+counts = np.array([len(l) for l in lines])
+starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
 
 img = cv2.imread(IMAGE_PATH)
 if img is None:
@@ -26,39 +39,121 @@ if img is None:
 h, w = img.shape[:2]
 base = float(max(w, h))
 
-def line_rms(pts):
+# Candidates only change f, k1 and k2; the centre is fixed, so the compiled
+# undistort path centres the points once here.
+cx = w / 2.0
+cy = h / 2.0
+centered_x = points[:, 0] - cx
+centered_y = points[:, 1] - cy
+UNDISTORT_ITERATIONS = 5  # cv2.undistortPoints' default criteria
+
+@njit(cache=True, fastmath=True)
+def _line_distances_jit(pts, starts, counts):
+    out = np.empty(pts.shape[0])
+    for j in range(starts.shape[0]):
+        s = starts[j]
+        n = counts[j]
+        mx = 0.0
+        my = 0.0
+        for i in range(s, s + n):
+            mx += pts[i, 0]
+            my += pts[i, 1]
+        mx /= n
+        my /= n
+        sxx = 0.0
+        sxy = 0.0
+        syy = 0.0
+        for i in range(s, s + n):
+            dx = pts[i, 0] - mx
+            dy = pts[i, 1] - my
+            sxx += dx * dx
+            sxy += dx * dy
+            syy += dy * dy
+        theta = 0.5 * np.arctan2(2.0 * sxy, sxx - syy)
+        ox = -np.sin(theta)
+        oy = np.cos(theta)
+        for i in range(s, s + n):
+            out[i] = (pts[i, 0] - mx) * ox + (pts[i, 1] - my) * oy
+    return out
+
+def line_distances(pts):
     """
-    pts: Nx2 array
-    returns RMS distance from best-fit line
+    pts: flat Nx2 array holding every line back to back
+    returns signed distances from each line's best-fit line
     """
-    if pts.shape[0] < 2:
-        return 0.0
-    mean = pts.mean(axis=0)
-    centered = pts - mean
-    # PCA via SVD
-    _, s, vt = np.linalg.svd(centered)
-    # second singular vector is orthogonal direction
-    orth = vt[1]
-    d = centered @ orth
-    return float(np.sqrt((d * d).mean()))
-
-def eval_params(f_factor, k1, k2):
+    if HAVE_NUMBA:
+        return _line_distances_jit(pts, starts, counts)
+    pts = pts.astype(np.float64)
+    means = np.add.reduceat(pts, starts, axis=0) / counts[:, None]
+    centered = pts - np.repeat(means, counts, axis=0)
+    x = centered[:, 0]
+    y = centered[:, 1]
+    # Per-line 2x2 scatter matrix; its major axis has a closed-form angle,
+    # so no SVD is needed and the orthogonal direction is that angle + 90deg.
+    sxx = np.add.reduceat(x * x, starts)
+    sxy = np.add.reduceat(x * y, starts)
+    syy = np.add.reduceat(y * y, starts)
+    theta = 0.5 * np.arctan2(2.0 * sxy, sxx - syy)
+    orth_x = np.repeat(-np.sin(theta), counts)
+    orth_y = np.repeat(np.cos(theta), counts)
+    return x * orth_x + y * orth_y
+
+def line_rms(d):
+    """
+    d: distances from line_distances
+    returns RMS distance from best-fit line, per line
+    """
+    return np.sqrt(np.add.reduceat(d * d, starts) / counts)
+
+@njit(cache=True, fastmath=True)
+def _undistort_jit(centered_x, centered_y, f, k1, k2, cx, cy, iterations):
+    out = np.empty((centered_x.shape[0], 2))
+    for i in range(centered_x.shape[0]):
+        x0 = centered_x[i] / f
+        y0 = centered_y[i] / f
+        x = x0
+        y = y0
+        for _ in range(iterations):
+            r2 = x * x + y * y
+            icdist = 1.0 / (1.0 + (k2 * r2 + k1) * r2)
+            if icdist < 0:
+                x = x0
+                y = y0
+                break
+            x = x0 * icdist
+            y = y0 * icdist
+        out[i, 0] = x * f + cx
+        out[i, 1] = y * f + cy
+    return out
+
+def camera_model(f_factor, k1, k2):
     f = f_factor * base
-    cx = w / 2.0
-    cy = h / 2.0
     K = np.array([[f, 0, cx],
                   [0, f, cy],
                   [0, 0, 1]], dtype=np.float32)
     dist = np.array([k1, k2, 0.0, 0.0, 0.0], dtype=np.float32)
+    return K, dist
+
+def undistort_lines(f_factor, k1, k2):
+    if HAVE_NUMBA:
+        # Same fixed-point inverse of the radial model as cv2.undistortPoints
+        # with P=K, compiled, so no OpenCV call (or K/dist) per candidate.
+        f = f_factor * base
+        return _undistort_jit(centered_x, centered_y, f, k1, k2, cx, cy, UNDISTORT_ITERATIONS)
+    K, dist = camera_model(f_factor, k1, k2)
+    # undistort points, keeping them in pixel coords using P=K
+    und = cv2.undistortPoints(points.reshape(-1, 1, 2), K, dist, P=K)
+    return und.reshape(-1, 2)
 
-    total = 0.0
-    for pts in lines:
-        # undistort points, keeping them in pixel coords using P=K
-        pts_reshaped = pts.reshape(-1, 1, 2)
-        und = cv2.undistortPoints(pts_reshaped, K, dist, P=K)
-        und = und.reshape(-1, 2)
-        total += line_rms(und)
-    return total, K, dist
+def eval_params(f_factor, k1, k2):
+    und = undistort_lines(f_factor, k1, k2)
+    return float(line_rms(line_distances(und)).sum())
+
+def residuals(ks, f_factor):
+    """Stacked point-to-line distances, each line scaled by 1/sqrt(N) so the
+    squared sum is the sum of per-line mean squares (long lines don't dominate)."""
+    und = undistort_lines(f_factor, ks[0], ks[1])
+    return line_distances(und) / np.sqrt(np.repeat(counts, counts))
 
 # Search grid (adjust if needed)
 f_factors = [0.7, 0.8, 0.9, 1.0, 1.1]
@@ -66,22 +161,42 @@ k1_vals   = [-0.30, -0.20, -0.15, -0.10, -0.05, 0.0]
 k2_vals   = [-0.10, -0.05, 0.0, 0.05]
 
 best_err = None
-best_K = None
-best_dist = None
 best_combo = None
 
 for f_factor in f_factors:
     for k1 in k1_vals:
         for k2 in k2_vals:
-            err, K, dist = eval_params(f_factor, k1, k2)
+            err = eval_params(f_factor, k1, k2)
             if best_err is None or err < best_err:
                 best_err = err
-                best_K = K
-                best_dist = dist
                 best_combo = (f_factor, k1, k2)
                 print(f"New best: f_factor={f_factor}, k1={k1}, k2={k2}, err={err:.4f}")
 
+# Refine k1/k2 of the grid minimum continuously, as the calibration pipeline
+# does. The focal factor stays at the grid winner: the pixel-space residual
+# keeps shrinking as f does, so letting it float collapses the fit. k1/k2 stay
+# within the grid's range, and the result is only kept if it improves.
+if least_squares is not None:
+    f_best = best_combo[0]
+    result = least_squares(
+        residuals,
+        x0=np.array(best_combo[1:], dtype=np.float64),
+        args=(f_best,),
+        method="trf",
+        x_scale=[0.1, 0.05],
+        # K/dist are float32, so finite differences need a visible step.
+        diff_step=1e-3,
+        bounds=([min(k1_vals), min(k2_vals)], [max(k1_vals), max(k2_vals)]),
+    )
+    err = eval_params(f_best, *result.x)
+    if err < best_err:
+        best_err = err
+        best_combo = (f_best, *(float(v) for v in result.x))
+        print(f"Refined ({result.nfev} evaluations): f_factor={best_combo[0]:.4f}, "
+              f"k1={best_combo[1]:.4f}, k2={best_combo[2]:.4f}, err={err:.4f}")
+
 print("Best combo:", best_combo, "err=", best_err)
+best_K, best_dist = camera_model(*best_combo)
 
 # Compute a 'new camera matrix' for full image undistortion
 newK, _ = cv2.getOptimalNewCameraMatrix(best_K, best_dist, (w, h), 1.0)
@@ -35,8 +35,10 @@ print(" - Press ESC to abort.")
 
 cv2.imshow(win, display)
 
+# Clicks are drawn by mouse_cb, which the GUI event loop runs while waitKey
+# blocks, so the loop only has to notice keys; a long wait keeps it idle.
 while True:
-    key = cv2.waitKey(20) & 0xFF
+    key = cv2.waitKey(150) & 0xFF
     if key == 27:  # ESC
         lines = []
         break
@@ -32,44 +32,29 @@ K    = np.load(K_PATH)
 dist = np.load(DIST_PATH)
 newK = np.load(NEWK_PATH)
 
-line_info = []  # list of (y_mean, x_left, x_right)
-
-for pts in lines_raw:
-    if pts.shape[0] < 2:
-        continue
-
-    # take first and last point only
-    endpoints = np.vstack([pts[0], pts[-1]]).reshape(-1, 1, 2)
-
-    # undistort endpoints into pixel coords of undistorted image
-    und = cv2.undistortPoints(endpoints, K, dist, P=newK).reshape(-1, 2)
-
-    x0, y0 = und[0]
-    x1, y1 = und[1]
-
-    x_left_line  = min(x0, x1)
-    x_right_line = max(x0, x1)
-    y_mean       = 0.5 * (y0 + y1)
-
-    line_info.append((y_mean, x_left_line, x_right_line))
-
-if len(line_info) < 2:
+# take first and last point of every line; all endpoints are undistorted
+# into pixel coords of the undistorted image in one call
+valid = [pts for pts in lines_raw if pts.shape[0] >= 2]
+if len(valid) < 2:
     raise RuntimeError("Not enough valid lines after processing")
+endpoints = np.stack([np.vstack([pts[0], pts[-1]]) for pts in valid]).reshape(-1, 1, 2)
+und = cv2.undistortPoints(endpoints, K, dist, P=newK).reshape(-1, 2, 2)
+
+x_left_line  = und[:, :, 0].min(axis=1)
+x_right_line = und[:, :, 0].max(axis=1)
+y_mean       = und[:, :, 1].mean(axis=1)
 
 # Horizontal limits: intersection of all line segments
-x_left  = max(li[1] for li in line_info) + MARGIN
-x_right = min(li[2] for li in line_info) - MARGIN
+x_left  = x_left_line.max() + MARGIN
+x_right = x_right_line.min() - MARGIN
 
 # Vertical limits: outermost lines
-line_info.sort(key=lambda t: t[0])  # sort by y_mean
-y_top = line_info[0][0] + MARGIN          # just below top line
-y_bot = line_info[-1][0] - MARGIN         # just above bottom line
+y_top = y_mean.min() + MARGIN          # just below top line
+y_bot = y_mean.max() - MARGIN          # just above bottom line
 
 # Clamp and convert to ints
-x_left  = int(max(0, min(w-1, x_left)))
-x_right = int(max(0, min(w-1, x_right)))
-y_top   = int(max(0, min(h-1, y_top)))
-y_bot   = int(max(0, min(h-1, y_bot)))
+x_left, x_right = np.clip([x_left, x_right], 0, w-1).astype(int).tolist()
+y_top, y_bot    = np.clip([y_top, y_bot], 0, h-1).astype(int).tolist()
 
 if x_right <= x_left or y_bot <= y_top:
     raise RuntimeError(f"Invalid crop box: ({x_left},{y_top})–({x_right},{y_bot})")
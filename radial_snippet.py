@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
 
+from core.rectification import build_rectify_maps, cuda_available, opencl_available
+
 K    = np.load("camera_matrix.npy")
 dist = np.load("dist_coeffs.npy")
 newK = np.load("new_camera_matrix.npy")
@@ -11,6 +13,28 @@ H = np.load("homography.npy")
 OUT_WIDTH  = 800   # or whatever you chose
 OUT_HEIGHT = 1600
 
+# Undistort and warp folded into one lookup table: each output pixel maps
+# straight back to its raw source pixel, so every frame is a single remap
+# (one interpolation, no intermediate undistorted image).
+# On CUDA builds the maps live on the GPU (cv2.cuda.remap needs float maps)
+# and each frame is uploaded, remapped and downloaded once. Without CUDA, an
+# OpenCL device gets the same treatment through UMat.
+USE_GPU = cuda_available()
+USE_OPENCL = not USE_GPU and opencl_available()
+map1, map2 = build_rectify_maps(
+    K, dist, newK, np.linalg.inv(H), (OUT_WIDTH, OUT_HEIGHT),
+    map_type=cv2.CV_32FC1 if USE_GPU else cv2.CV_16SC2,
+)
+if USE_GPU:
+    gpu_map1 = cv2.cuda_GpuMat()
+    gpu_map1.upload(map1)
+    gpu_map2 = cv2.cuda_GpuMat()
+    gpu_map2.upload(map2)
+    gpu_frame = cv2.cuda_GpuMat()
+    gpu_out = cv2.cuda_GpuMat()
+elif USE_OPENCL:
+    map1, map2 = cv2.UMat(map1), cv2.UMat(map2)
+
 cap = cv2.VideoCapture(0)  # or "/dev/video0"
 
 while True:
@@ -18,8 +42,14 @@ while True:
     if not ret:
         break
 
-    undist = cv2.undistort(frame, K, dist, None, newK)
-    corrected = cv2.warpPerspective(undist, H, (OUT_WIDTH, OUT_HEIGHT))
+    if USE_GPU:
+        gpu_frame.upload(frame)
+        cv2.cuda.remap(gpu_frame, gpu_map1, gpu_map2, cv2.INTER_LINEAR, dst=gpu_out)
+        corrected = gpu_out.download()
+    elif USE_OPENCL:
+        corrected = cv2.remap(cv2.UMat(frame), map1, map2, cv2.INTER_LINEAR)
+    else:
+        corrected = cv2.remap(frame, map1, map2, cv2.INTER_LINEAR)
 
     # show, save, or diff against previous frame
     cv2.imshow("corrected", corrected)
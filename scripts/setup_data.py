@@ -1,22 +1,33 @@
+from django.db import transaction
+
 from core.models import Sheet, Camera
 
+SHEET_NUMBERS = range(1, 9)
+
 def run():
-    # Create 8 sheets
-    for i in range(1, 9):
-        sheet, created = Sheet.objects.get_or_create(number=i)
-        if created:
-            print(f"Created Sheet {i}")
-        
-        # Create Odd camera
+    # Read what already exists once, then insert only the missing rows in one
+    # transaction instead of a get_or_create round trip per object.
+    with transaction.atomic():
+        existing_sheets = set(Sheet.objects.values_list('number', flat=True))
+        new_sheets = [Sheet(number=i) for i in SHEET_NUMBERS if i not in existing_sheets]
+        Sheet.objects.bulk_create(new_sheets)
+        for sheet in new_sheets:
+            print(f"Created Sheet {sheet.number}")
+
+        sheet_ids = dict(Sheet.objects.filter(number__in=SHEET_NUMBERS).values_list('number', 'id'))
+        existing_cameras = set(
+            Camera.objects.filter(sheet_id__in=sheet_ids.values()).values_list('sheet_id', 'side')
+        )
+
+        # Create Odd and Even cameras
         # Assigning dummy device indices for now: 0, 1, 2...
         # In reality, user will need to update these via Admin
-        idx_odd = (i - 1) * 2
-        cam_odd, created = Camera.objects.get_or_create(sheet=sheet, side='odd', defaults={'device_index': idx_odd})
-        if created:
-            print(f"  Created Camera Odd (Index {idx_odd})")
-
-        # Create Even camera
-        idx_even = (i - 1) * 2 + 1
-        cam_even, created = Camera.objects.get_or_create(sheet=sheet, side='even', defaults={'device_index': idx_even})
-        if created:
-            print(f"  Created Camera Even (Index {idx_even})")
+        new_cameras = []
+        for i in SHEET_NUMBERS:
+            for offset, side in enumerate(('odd', 'even')):
+                if (sheet_ids[i], side) in existing_cameras:
+                    continue
+                idx = (i - 1) * 2 + offset
+                new_cameras.append(Camera(sheet_id=sheet_ids[i], side=side, device_index=idx))
+                print(f"  Sheet {i}: created Camera {side.capitalize()} (Index {idx})")
+        Camera.objects.bulk_create(new_cameras, ignore_conflicts=True)
@@ -3,13 +3,23 @@ import numpy as np
 import time
 from datetime import datetime
 import os
+import queue
+import threading
+
+from core.image_io import encode_jpeg
+from core.rectification import cuda_available, opencl_available
+from core.utils import configure_capture, open_camera
 
 # ==== CONFIG ====
 DEVICE = 0  # /dev/video0 on Linux, index 0 on Windows
+CAPTURE_FOURCC = "MJPG"  # Compressed frames from the grabber; "" keeps the driver default
 OUT_WIDTH = 800
 OUT_HEIGHT = 1600
 OUTPUT_DIR = "corrected_frames"
 POLL_INTERVAL_SEC = 1.0
+SAVE_QUEUE_SIZE = 4
+SAVE_FORMAT = "jpg"  # "webp" roughly halves file size but encodes ~25x slower
+WEBP_QUALITY = 85
 CHANGE_THRESHOLD = 5.0
 COMPARE_W = 200
 COMPARE_H = 400
@@ -19,47 +29,193 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 H = np.load("homography.npy")
 
-cap = cv2.VideoCapture(DEVICE)
+cap = open_camera(DEVICE)
 if not cap.isOpened():
     raise RuntimeError("Cannot open capture device")
+# Only the pixel format is requested: the homography was measured at the
+# device's current resolution.
+fourcc, width, height, _ = configure_capture(cap, CAPTURE_FOURCC)
+print(f"Capture format: {fourcc or 'default'} {width}x{height}")
+# Keep the driver from queueing stale frames between polls.
+cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+# Change detection compares the green channel (a fine luminance proxy)
+# point-sampled every STRIDE pixels. Every backend builds this same thumbnail,
+# so CHANGE_THRESHOLD means the same thing on CPU, CUDA and OpenCL.
+STRIDE_X = max(1, OUT_WIDTH // COMPARE_W)
+STRIDE_Y = max(1, OUT_HEIGHT // COMPARE_H)
+thumb_shape = (OUT_HEIGHT // STRIDE_Y, OUT_WIDTH // STRIDE_X)
+thumb_size = (thumb_shape[1], thumb_shape[0])
+# Sampled region: a whole number of strides, so a nearest-neighbour resize of
+# it picks exactly the pixels the strided slice does.
+SAMPLE_W = thumb_shape[1] * STRIDE_X
+SAMPLE_H = thumb_shape[0] * STRIDE_Y
+
+# On CUDA builds the warp and the nearest-neighbour downscale run on the GPU
+# and only the small BGR thumbnail comes back each poll; the full frame is
+# downloaded only when it is saved. Every call shares one stream and writes
+# its own buffer.
+USE_GPU = cuda_available()
+if USE_GPU:
+    stream = cv2.cuda_Stream()
+    gpu_frame = cv2.cuda_GpuMat()
+    gpu_warped = cv2.cuda_GpuMat(OUT_HEIGHT, OUT_WIDTH, cv2.CV_8UC3)
+    # ROI header over the warp buffer; the warp writes in place, so it stays valid.
+    gpu_sample = gpu_warped.rowRange(0, SAMPLE_H).colRange(0, SAMPLE_W)
+    gpu_small = cv2.cuda_GpuMat()
+    small_host = np.empty((*thumb_shape, 3), dtype=np.uint8)
+
+# Without CUDA, OpenCL devices (Intel iGPUs, some ARM boards) run the same
+# pipeline through OpenCV's transparent API: UMat inputs dispatch the warp,
+# downscale and channel extraction to the device, and only the thumbnail is
+# read back.
+USE_OPENCL = not USE_GPU and opencl_available()
+if USE_OPENCL:
+    umat_warped = cv2.UMat(OUT_HEIGHT, OUT_WIDTH, cv2.CV_8UC3)
+    umat_sample = cv2.UMat(umat_warped, (0, SAMPLE_H), (0, SAMPLE_W))
+    umat_small = cv2.UMat(thumb_shape[0], thumb_shape[1], cv2.CV_8UC3)
+    umat_gray = cv2.UMat(thumb_shape[0], thumb_shape[1], cv2.CV_8UC1)
+
+# Per-poll buffers are allocated once and filled in place. The two thumbnails
+# swap roles whenever a frame is saved, so the reference is never copied.
+warped = np.empty((OUT_HEIGHT, OUT_WIDTH, 3), dtype=np.uint8)
+gray = np.empty(thumb_shape, dtype=np.uint8)
+prev_small = np.empty_like(gray)
+have_prev = False
+
+# A reader thread drains the device with grab() and decodes a frame only when
+# the analysis loop asks for one, and a writer thread encodes saved frames, so
+# neither driver reads nor disk writes stall the change-detection loop.
+latest = {"frame": None, "seq": 0}
+frame_ready = threading.Condition()
+want_frame = threading.Event()
+stop = threading.Event()
+save_queue = queue.Queue(maxsize=SAVE_QUEUE_SIZE)
 
-prev_small = None
+def read_frames():
+    # Every VideoCapture call stays on this thread. grab() keeps the driver
+    # queue empty without decoding; only the grab after a request is retrieved.
+    while not stop.is_set():
+        if not cap.grab():
+            print("Failed to read frame")
+            time.sleep(POLL_INTERVAL_SEC)
+            continue
+        if not want_frame.is_set():
+            continue
+        ret, frame = cap.retrieve()
+        if not ret:
+            print("Failed to decode frame")
+            continue
+        want_frame.clear()
+        with frame_ready:
+            latest["frame"] = frame
+            latest["seq"] += 1
+            frame_ready.notify()
+
+def encode_frame(frame):
+    if SAVE_FORMAT == "webp":
+        ok, buf = cv2.imencode(".webp", frame, [cv2.IMWRITE_WEBP_QUALITY, WEBP_QUALITY])
+        return buf.tobytes() if ok else None
+    # libjpeg-turbo when PyTurboJPEG is installed, cv2.imencode otherwise.
+    return encode_jpeg(frame)
+
+def write_frames():
+    while True:
+        item = save_queue.get()
+        if item is None:
+            return
+        ts, frame = item
+        path = os.path.join(OUTPUT_DIR, f"frame_{ts}.{SAVE_FORMAT}")
+        # A failure costs this frame only; the writer keeps draining the queue.
+        try:
+            data = encode_frame(frame)
+            if data is None:
+                print("Failed to encode", path)
+                continue
+            with open(path, "wb") as f:
+                f.write(data)
+        except Exception as exc:
+            print(f"Failed to save {path}: {exc}")
+            continue
+        print("Saved", path)
 
 def save_frame(frame):
     ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    path = os.path.join(OUTPUT_DIR, f"frame_{ts}.jpg")
-    cv2.imwrite(path, frame)
-    print("Saved", path)
+    while True:
+        try:
+            save_queue.put_nowait((ts, frame))
+            return
+        except queue.Full:
+            # The writer is behind; drop the oldest pending frame.
+            try:
+                save_queue.get_nowait()
+                print("Writer behind; dropped a pending frame")
+            except queue.Empty:
+                pass
+
+reader = threading.Thread(target=read_frames, name="frame-reader", daemon=True)
+writer = threading.Thread(target=write_frames, name="frame-writer", daemon=True)
+reader.start()
+writer.start()
 
+last_seq = 0
 try:
     while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("Failed to read frame")
-            time.sleep(POLL_INTERVAL_SEC)
-            continue
+        # Ask for a fresh frame and wake only once it is decoded; the timeout
+        # keeps Ctrl+C responsive if the device stops delivering.
+        want_frame.set()
+        with frame_ready:
+            if not frame_ready.wait_for(lambda: latest["seq"] != last_seq, timeout=POLL_INTERVAL_SEC):
+                continue
+            frame = latest["frame"]
+            last_seq = latest["seq"]
 
-        # Apply perspective correction
-        warped = cv2.warpPerspective(frame, H, (OUT_WIDTH, OUT_HEIGHT))
+        if USE_GPU:
+            gpu_frame.upload(frame, stream)
+            cv2.cuda.warpPerspective(gpu_frame, H, (OUT_WIDTH, OUT_HEIGHT), dst=gpu_warped, stream=stream)
+            cv2.cuda.resize(
+                gpu_sample, thumb_size, dst=gpu_small, interpolation=cv2.INTER_NEAREST, stream=stream
+            )
+            gpu_small.download(stream, small_host)
+            stream.waitForCompletion()
+            np.copyto(gray, small_host[:, :, 1])
+            load_warped = lambda: gpu_warped.download()
+        elif USE_OPENCL:
+            cv2.warpPerspective(cv2.UMat(frame), H, (OUT_WIDTH, OUT_HEIGHT), dst=umat_warped)
+            cv2.resize(umat_sample, thumb_size, dst=umat_small, interpolation=cv2.INTER_NEAREST)
+            cv2.extractChannel(umat_small, 1, dst=umat_gray)
+            np.copyto(gray, umat_gray.get())
+            load_warped = lambda: umat_warped.get()
+        else:
+            # Apply perspective correction
+            cv2.warpPerspective(frame, H, (OUT_WIDTH, OUT_HEIGHT), dst=warped)
+            # The writer thread holds saved frames, so hand it a copy of the
+            # reused buffer.
+            load_warped = lambda: warped.copy()
 
-        # Downscale for change detection
-        small = cv2.resize(warped, (COMPARE_W, COMPARE_H))
-        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            # The strided green-channel copy is the thumbnail itself.
+            np.copyto(gray, warped[:SAMPLE_H:STRIDE_Y, :SAMPLE_W:STRIDE_X, 1])
 
-        if prev_small is None:
-            save_frame(warped)
-            prev_small = gray
+        if not have_prev:
+            save_frame(load_warped())
+            gray, prev_small = prev_small, gray
+            have_prev = True
         else:
-            diff = cv2.absdiff(gray, prev_small)
-            mean_diff = diff.mean()
+            # NORM_L1 fuses abs-diff and sum in one pass.
+            mean_diff = cv2.norm(gray, prev_small, cv2.NORM_L1) / gray.size
 
             if mean_diff >= CHANGE_THRESHOLD:
-                save_frame(warped)
-                prev_small = gray
+                save_frame(load_warped())
+                gray, prev_small = prev_small, gray
 
         time.sleep(POLL_INTERVAL_SEC)
 
 except KeyboardInterrupt:
     pass
 finally:
+    stop.set()
+    reader.join()
+    if writer.is_alive():
+        save_queue.put(None)
+    writer.join()
     cap.release()
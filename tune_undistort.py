@@ -39,21 +39,29 @@ print("Press 's' to save parameters, ESC to exit without saving.")
 saved = False
 best_params = None
 
+# Side-by-side canvas; the original half never changes, so it is copied once
+# and only the undistorted half is redrawn when a slider actually moves.
+vis = np.empty((h, 2 * w, 3), dtype=img.dtype)
+vis[:, :w] = img
+last_k = None
+
 while True:
     k1 = slider_to_k(cv2.getTrackbarPos("k1", "undistort"))
     k2 = slider_to_k(cv2.getTrackbarPos("k2", "undistort"))
     # k3 = slider_to_k(cv2.getTrackbarPos("k3", "undistort"))
 
-    dist = np.array([k1, k2, 0.0, 0.0, 0.0], dtype=np.float32)
+    if (k1, k2) != last_k:
+        last_k = (k1, k2)
+        dist = np.array([k1, k2, 0.0, 0.0, 0.0], dtype=np.float32)
 
-    # Compute optimal new camera matrix (keeps FOV)
-    newK, _ = cv2.getOptimalNewCameraMatrix(K, dist, (w, h), 1.0)
+        # Compute optimal new camera matrix (keeps FOV)
+        newK, _ = cv2.getOptimalNewCameraMatrix(K, dist, (w, h), 1.0)
 
-    undist = cv2.undistort(img, K, dist, None, newK)
+        map1, map2 = cv2.initUndistortRectifyMap(K, dist, None, newK, (w, h), cv2.CV_16SC2)
+        vis[:, w:] = cv2.remap(img, map1, map2, cv2.INTER_LINEAR)
 
-    # Show side-by-side for reference
-    vis = np.hstack([img, undist])
-    cv2.imshow("undistort", vis)
+        # Show side-by-side for reference
+        cv2.imshow("undistort", vis)
 
     key = cv2.waitKey(30) & 0xFF
     if key == 27:  # ESC
@@ -1,4 +1,5 @@
 import os
+
 import cv2
 import numpy as np
 
@@ -33,38 +34,43 @@ candidates = [
     ( 0.00, 0.00),   # no distortion (reference)
 ]
 
-thumbs = []
 font = cv2.FONT_HERSHEY_SIMPLEX
 
+# Thumbnails are rendered straight at grid size: scaling newK by the
+# thumbnail factor makes the remap undistort and downsample together, instead
+# of undistorting at full resolution and resizing afterwards.
+scale = 0.4
+thumb_w, thumb_h = int(w * scale), int(h * scale)
+S = np.diag([thumb_w / w, thumb_h / h, 1.0])
+
+# Arrange thumbnails in a grid (2 rows)
+cols = 4
+rows = int(np.ceil(len(candidates) / cols))
+
+# Each candidate's map fills its own tile of one canvas-sized table, so a
+# single remap renders the whole grid. Unused tiles point outside the image
+# and stay black.
+map_x = np.full((rows * thumb_h, cols * thumb_w), -1.0, dtype=np.float32)
+map_y = np.full_like(map_x, -1.0)
 for idx, (k1, k2) in enumerate(candidates):
     dist = np.array([k1, k2, 0.0, 0.0, 0.0], dtype=np.float32)
     newK, _ = cv2.getOptimalNewCameraMatrix(K_base, dist, (w, h), 1.0)
-    undist = cv2.undistort(img, K_base, dist, None, newK)
-
-    # Make smaller thumbnail for grid
-    scale = 0.4
-    und_small = cv2.resize(
-        undist,
-        (int(w * scale), int(h * scale)),
-        interpolation=cv2.INTER_AREA
+    tile_x, tile_y = cv2.initUndistortRectifyMap(
+        K_base, dist, None, S @ newK, (thumb_w, thumb_h), cv2.CV_32FC1
     )
+    r, c = divmod(idx, cols)
+    map_x[r*thumb_h:(r+1)*thumb_h, c*thumb_w:(c+1)*thumb_w] = tile_x
+    map_y[r*thumb_h:(r+1)*thumb_h, c*thumb_w:(c+1)*thumb_w] = tile_y
 
-    # Label with index and params
-    label = f"{idx}: k1={k1:.2f}, k2={k2:.2f}"
-    cv2.putText(und_small, label, (10, 30), font, 0.7, (0, 0, 255), 2)
+map1, map2 = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+# remap has no INTER_AREA; bilinear is enough for a preview grid.
+grid = cv2.remap(img, map1, map2, cv2.INTER_LINEAR)
 
-    thumbs.append(und_small)
-
-# Arrange thumbnails in a grid (2 rows)
-cols = 4
-rows = int(np.ceil(len(thumbs) / cols))
-thumb_h, thumb_w = thumbs[0].shape[:2]
-grid = np.zeros((rows * thumb_h, cols * thumb_w, 3), dtype=np.uint8)
-
-for i, t in enumerate(thumbs):
-    r = i // cols
-    c = i % cols
-    grid[r*thumb_h:(r+1)*thumb_h, c*thumb_w:(c+1)*thumb_w] = t
+# Label each tile with its index and params
+for idx, (k1, k2) in enumerate(candidates):
+    r, c = divmod(idx, cols)
+    label = f"{idx}: k1={k1:.2f}, k2={k2:.2f}"
+    cv2.putText(grid, label, (c*thumb_w + 10, r*thumb_h + 30), font, 0.7, (0, 0, 255), 2)
 
 os.makedirs(JPEG_DIR, exist_ok=True)
 cv2.imwrite(OUT_PATH, grid)
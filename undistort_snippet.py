@@ -1,18 +1,33 @@
 import cv2
 import numpy as np
 
+from core.rectification import opencl_available
+
 K    = np.load("camera_matrix.npy")
 dist = np.load("dist_coeffs.npy")
 newK = np.load("new_camera_matrix.npy")
 
 cap = cv2.VideoCapture(0)  # or "/dev/video0"
 
+# cv2.undistort rebuilds its lookup table on every call; K/dist/newK never
+# change, so build it once for the capture size and only remap per frame.
+map1 = map2 = None
+# With an OpenCL device the maps and frames are UMats, so remap runs there.
+USE_OPENCL = opencl_available()
+
 while True:
     ret, frame = cap.read()
     if not ret:
         break
 
-    undist = cv2.undistort(frame, K, dist, None, newK)
+    if map1 is None:
+        h, w = frame.shape[:2]
+        map1, map2 = cv2.initUndistortRectifyMap(K, dist, None, newK, (w, h), cv2.CV_16SC2)
+        if USE_OPENCL:
+            map1, map2 = cv2.UMat(map1), cv2.UMat(map2)
+    if USE_OPENCL:
+        frame = cv2.UMat(frame)
+    undist = cv2.remap(frame, map1, map2, cv2.INTER_LINEAR)
 
     cv2.imshow("undistorted", undist)
     if cv2.waitKey(1) & 0xFF == 27: